@@ -0,0 +1,208 @@
+"""
+Candidate index for fuzzy company-name matching.
+
+Every name within the length range that can reach the similarity
+threshold gets an upper bound on its SequenceMatcher ratio, computed
+with numpy from per-name character counts and from the bigrams it shares
+with the query (via a character-bigram inverted index). Names are scored
+best bound first until the bound drops below the best score found, so
+the result is the one a linear scan gives while only a handful of names
+are usually scored.
+
+The index is a handful of flat numpy arrays (see compile_index), so a
+compiled registry can be memory-mapped instead of rebuilt per worker.
+"""
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+import numpy as np
+
+MIN_SCORE = 0.6  # Lowest ratio that is reported as a match ("similar")
+GRAM = 2
+CHAR_BUCKETS = "abcdefghijklmnopqrstuvwxyz0123456789 "  # Characters counted in a bucket of their own
+OTHER_BUCKETS = 32  # Any other character is counted in bucket len(CHAR_BUCKETS) + code point % OTHER_BUCKETS
+BUCKET_COUNT = len(CHAR_BUCKETS) + OTHER_BUCKETS
+
+_ASCII_BUCKET = len(CHAR_BUCKETS) + np.arange(128) % OTHER_BUCKETS
+_ASCII_BUCKET[[ord(c) for c in CHAR_BUCKETS]] = np.arange(len(CHAR_BUCKETS))
+
+
+def _grams(text):
+    """Distinct character bigrams, padded so word boundaries count too."""
+    padded = f" {text} "
+    return {padded[i:i + GRAM] for i in range(len(padded) - GRAM + 1)}
+
+
+def _blob(strings):
+    """Concatenate UTF-8 strings into one byte array plus offsets."""
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8).copy(), offsets
+
+
+def _char_counts(names):
+    """
+    Character counts per bucket, one row per name, capped at 255. Equal
+    characters always share a bucket, so summing min(query count, name
+    count) over buckets bounds how many characters SequenceMatcher can
+    match (like its quick_ratio).
+    """
+    sizes = np.array([len(n) for n in names], dtype=np.int64)
+    points = np.frombuffer("".join(names).encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+    buckets = len(CHAR_BUCKETS) + points % OTHER_BUCKETS
+    ascii_chars = points < 128
+    buckets[ascii_chars] = _ASCII_BUCKET[points[ascii_chars]]
+    owner = np.repeat(np.arange(len(sizes)), sizes)
+    flat = np.bincount(owner * BUCKET_COUNT + buckets, minlength=len(sizes) * BUCKET_COUNT)
+    return np.minimum(flat.reshape(len(sizes), BUCKET_COUNT), 255).astype(np.uint8)
+
+
+def _length_arrays(names, lengths):
+    """
+    IDs ordered by name length, plus the character counts transposed into
+    that order, so a length band is one contiguous slice per bucket.
+    """
+    length_order = np.argsort(lengths, kind="stable").astype(np.int32)
+    counts = _char_counts(names)
+    return length_order, np.ascontiguousarray(counts[length_order].T)
+
+
+def compile_index(names):
+    """Build the index arrays for a list of company names."""
+    names = [n.lower() for n in names]
+    exact = {}
+    postings = defaultdict(list)
+    for i, name in enumerate(names):
+        exact.setdefault(name.encode("utf-8"), i)  # First entry wins, as in a linear scan
+        for gram in _grams(name):
+            postings[gram.encode("utf-8")].append(i)
+
+    gram_keys = sorted(postings)
+    gram_ptr = np.zeros(len(gram_keys) + 1, dtype=np.int64)
+    gram_ptr[1:] = np.cumsum([len(postings[g]) for g in gram_keys])
+    gram_ids = np.fromiter((i for g in gram_keys for i in postings[g]), dtype=np.int32, count=int(gram_ptr[-1]))
+
+    exact_keys = sorted(exact)
+    lengths = np.array([len(n) for n in names], dtype=np.int32)
+    name_blob, name_offsets = _blob(names)
+    length_order, char_counts = _length_arrays(names, lengths)
+    return {
+        "lengths": lengths,
+        "name_blob": name_blob,
+        "name_offsets": name_offsets,
+        "length_order": length_order,
+        "char_counts": char_counts,  # [bucket, position in length_order]
+        "gram_keys": np.array(gram_keys, dtype=bytes) if gram_keys else np.empty(0, dtype="S1"),
+        "gram_ptr": gram_ptr,
+        "gram_ids": gram_ids,
+        "exact_keys": np.array(exact_keys, dtype=bytes) if exact_keys else np.empty(0, dtype="S1"),
+        "exact_ids": np.array([exact[k] for k in exact_keys], dtype=np.int32),
+    }
+
+
+def _find_sorted(keys, key):
+    """Position of `key` in sorted array `keys`, or -1."""
+    pos = int(np.searchsorted(keys, key))
+    return pos if pos < len(keys) and keys[pos] == key else -1
+
+
+class CompanyIndex:
+    """Exact-name lookup plus a bigram index over lowercased company names."""
+
+    def __init__(self, arrays):
+        self.lengths = arrays["lengths"]
+        self.name_blob = arrays["name_blob"]
+        self.name_offsets = arrays["name_offsets"]
+        if "length_order" in arrays and arrays["char_counts"].shape[0] == BUCKET_COUNT:
+            self.length_order = arrays["length_order"]
+            self.char_counts = arrays["char_counts"]
+        else:  # Registry compiled before these were stored, or with other buckets
+            self.length_order, self.char_counts = _length_arrays(
+                [self.name(i) for i in range(len(self))], np.asarray(self.lengths),
+            )
+        self.sorted_lengths = self.lengths[self.length_order]
+        self.gram_keys = arrays["gram_keys"]
+        self.gram_ptr = arrays["gram_ptr"]
+        self.gram_ids = arrays["gram_ids"]
+        self.exact_keys = arrays["exact_keys"]
+        self.exact_ids = arrays["exact_ids"]
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def name(self, i):
+        """Lowercased name of company `i`."""
+        return self.name_blob[self.name_offsets[i]:self.name_offsets[i + 1]].tobytes().decode("utf-8")
+
+    def _shared_grams(self, grams):
+        """Number of the given bigrams each name contains, indexed by ID."""
+        lists = []
+        for gram in grams:
+            pos = _find_sorted(self.gram_keys, gram.encode("utf-8"))
+            if pos >= 0:
+                lists.append(self.gram_ids[self.gram_ptr[pos]:self.gram_ptr[pos + 1]])
+        if not lists:
+            return np.zeros(len(self), dtype=np.int64)
+        return np.bincount(np.concatenate(lists), minlength=len(self))
+
+    def shortlist(self, name_lower):
+        """
+        (ids, bounds) for the names that could reach MIN_SCORE against
+        `name_lower`, ordered by the upper bound on their ratio (highest
+        first, then by ID).
+
+        The ratio is 2*M / (a+b) for M matched characters, and M is at most
+          - min(a, b), which limits the lengths worth looking at;
+          - the overlap of the two character multisets;
+          - (shared bigram occurrences + a + b + 1) // 3, since matched
+            blocks of length L share L-1 bigrams and there are at most
+            a+b-2M+1 blocks.
+        """
+        a = len(name_lower)
+        low = a * MIN_SCORE / (2 - MIN_SCORE) - 1e-9  # Slack so a score of exactly MIN_SCORE survives rounding
+        high = a * (2 - MIN_SCORE) / MIN_SCORE + 1e-9
+        start = int(np.searchsorted(self.sorted_lengths, low, side="left"))
+        stop = int(np.searchsorted(self.sorted_lengths, high, side="right"))
+        ids = self.length_order[start:stop]
+        lengths = self.sorted_lengths[start:stop].astype(np.int64)
+
+        query = _char_counts([name_lower])[0]
+        common = np.zeros(len(ids), dtype=np.int64)
+        for bucket in np.flatnonzero(query):
+            common += np.minimum(self.char_counts[bucket, start:stop], query[bucket])
+
+        grams = _grams(name_lower)
+        repeats = (a + 1) - len(grams)  # Bigram occurrences in the padded query beyond the distinct ones
+        blocks = (self._shared_grams(grams)[ids] + repeats + a + lengths + 1) // 3
+
+        matched = np.minimum(np.minimum(common, blocks), np.minimum(lengths, a))
+        bounds = 2.0 * matched / (a + lengths)
+        keep = bounds >= MIN_SCORE - 1e-9
+        ids, bounds = ids[keep], bounds[keep]
+
+        order = np.lexsort((ids, -bounds))
+        return ids[order], bounds[order]
+
+    def match(self, name_lower):
+        """
+        Best match for a lowercased name as (company index, score), where
+        score is 1.0 for an exact match. Returns (None, 0) when nothing in
+        the shortlist reaches MIN_SCORE. Ties go to the lowest index, as in
+        a linear scan.
+        """
+        pos = _find_sorted(self.exact_keys, name_lower.encode("utf-8"))
+        if pos >= 0:
+            return int(self.exact_ids[pos]), 1.0
+
+        best_id, best_score = None, 0
+        ids, bounds = self.shortlist(name_lower)
+        for i, bound in zip(ids.tolist(), bounds.tolist()):
+            if bound < best_score:
+                break  # Every remaining bound is lower still
+            score = SequenceMatcher(None, name_lower, self.name(i)).ratio()
+            if best_id is None or score > best_score or (score == best_score and i < best_id):
+                best_id, best_score = i, score
+        if best_score < MIN_SCORE:
+            return None, 0
+        return best_id, best_score
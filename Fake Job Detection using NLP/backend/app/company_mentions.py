@@ -0,0 +1,145 @@
+"""
+Company mention extraction — finds every known company name in a posting.
+
+Names are compiled into an Aho-Corasick automaton over words rather than
+characters: patterns are token sequences, so a scan is one pass over the
+posting's words whatever the number of companies, and matches always fall
+on word boundaries ("Meta" does not fire inside "metadata").
+
+The automaton is stored as flat numpy arrays (see compile_matcher) so a
+compiled registry can be memory-mapped.
+"""
+import re
+from collections import deque
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _tokens(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def compile_matcher(names):
+    """Build the automaton arrays for a list of company names."""
+    vocab = {}  # word -> provisional token id
+    goto = {}  # (state, token id) -> state
+    terminal = [-1]  # Company id whose name ends at this state, or -1
+    depth = [0]  # Name length in tokens at this state
+
+    for company_id, name in enumerate(names):
+        words = _tokens(name)
+        if not words:
+            continue
+        state = 0
+        for word in words:
+            tok = vocab.setdefault(word, len(vocab))
+            child = goto.get((state, tok))
+            if child is None:
+                child = len(terminal)
+                goto[(state, tok)] = child
+                terminal.append(-1)
+                depth.append(depth[state] + 1)
+            state = child
+        if terminal[state] == -1:  # First entry wins for duplicate names
+            terminal[state] = company_id
+
+    # Failure and output links, breadth first
+    fail = [0] * len(terminal)
+    output_link = [0] * len(terminal)  # Nearest proper suffix state that is terminal
+    children = [[] for _ in terminal]
+    for (state, tok), child in goto.items():
+        children[state].append((tok, child))
+    queue = deque(child for _, child in children[0])
+    while queue:
+        state = queue.popleft()
+        for tok, child in children[state]:
+            fallback = fail[state]
+            while fallback and (fallback, tok) not in goto:
+                fallback = fail[fallback]
+            link = goto.get((fallback, tok), 0)
+            fail[child] = link
+            output_link[child] = link if terminal[link] != -1 else output_link[link]
+            queue.append(child)
+
+    # Renumber tokens in sorted word order so lookups can binary-search
+    words = sorted(vocab, key=lambda w: w.encode("utf-8"))
+    token_of = {vocab[w]: i for i, w in enumerate(words)}
+    vocab_size = max(len(words), 1)
+    keys = sorted((state * vocab_size + token_of[tok], child) for (state, tok), child in goto.items())
+
+    return {
+        "vocab": np.array([w.encode("utf-8") for w in words], dtype=bytes) if words else np.empty(0, dtype="S1"),
+        "goto_keys": np.array([k for k, _ in keys], dtype=np.int64),
+        "goto_next": np.array([c for _, c in keys], dtype=np.int32),
+        "fail": np.array(fail, dtype=np.int32),
+        "terminal": np.array(terminal, dtype=np.int32),
+        "depth": np.array(depth, dtype=np.int32),
+        "output_link": np.array(output_link, dtype=np.int32),
+    }
+
+
+class CompanyMatcher:
+    """Word-level Aho-Corasick automaton over a list of company names."""
+
+    def __init__(self, arrays):
+        self.vocab = arrays["vocab"]
+        self.vocab_size = max(len(self.vocab), 1)
+        self.goto_keys = arrays["goto_keys"]
+        self.goto_next = arrays["goto_next"]
+        self.fail = arrays["fail"]
+        self.terminal = arrays["terminal"]
+        self.depth = arrays["depth"]
+        self.output_link = arrays["output_link"]
+
+    def _goto(self, state, tok):
+        key = state * self.vocab_size + tok
+        pos = int(np.searchsorted(self.goto_keys, key))
+        if pos < len(self.goto_keys) and self.goto_keys[pos] == key:
+            return int(self.goto_next[pos])
+        return -1
+
+    def _token_ids(self, words):
+        """Token id of each word, or -1 for words that appear in no name."""
+        if not len(self.vocab) or not words:
+            return [-1] * len(words)
+        encoded = np.array([w.encode("utf-8") for w in words], dtype=bytes)
+        pos = np.minimum(np.searchsorted(self.vocab, encoded), len(self.vocab) - 1)
+        return np.where(self.vocab[pos] == encoded, pos, -1).tolist()
+
+    def find(self, text):
+        """
+        Company mentions in `text` as (company id, start, end) character
+        spans, leftmost-longest and non-overlapping.
+        """
+        lowered = text.lower()
+        spans = [m.span() for m in TOKEN_RE.finditer(lowered)]
+        tokens = self._token_ids([lowered[start:end] for start, end in spans])
+        hits = []  # (start token, end token, company id)
+        state = 0
+        for i, tok in enumerate(tokens):
+            if tok < 0:  # Word appears in no name: no match can span it
+                state = 0
+                continue
+            nxt = self._goto(state, tok)
+            while nxt < 0 and state:
+                state = int(self.fail[state])
+                nxt = self._goto(state, tok)
+            state = max(nxt, 0)
+
+            match = state if self.terminal[state] != -1 else int(self.output_link[state])
+            while match:
+                hits.append((i - int(self.depth[match]) + 1, i, int(self.terminal[match])))
+                match = int(self.output_link[match])
+
+        # Keep the longest match at each position, then drop overlaps left to right
+        hits.sort(key=lambda h: (h[0], -h[1]))
+        mentions = []
+        next_free = 0
+        for first, last, company_id in hits:
+            if first < next_free:
+                continue
+            mentions.append((company_id, spans[first][0], spans[last][1]))
+            next_free = last + 1
+        return mentions
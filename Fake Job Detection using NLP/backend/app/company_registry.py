@@ -0,0 +1,150 @@
+"""
+Compiled company registry — the company list plus its match index and
+mention automaton, stored as .npy arrays and memory-mapped by every worker.
+
+Layout under data/company_registry/:
+    <version>/       one directory of .npy files per build
+    CURRENT          name of the version workers should serve
+
+build_company_registry.py writes a new version directory and then swaps
+CURRENT with os.replace, so readers never see a half-written registry.
+Workers re-check CURRENT every COMPANY_REGISTRY_CHECK seconds and switch
+to the new version in place; requests already holding the old registry
+finish with it and its mappings are released afterwards. Without a
+compiled registry, known_companies.json is compiled in memory and
+reloaded when the file changes.
+"""
+import os
+import json
+import time
+import shutil
+import threading
+
+import numpy as np
+
+from app.company_index import CompanyIndex, compile_index, _blob
+from app.company_mentions import CompanyMatcher, compile_matcher
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BACKEND_DIR, "data")
+SOURCE_PATH = os.path.join(DATA_DIR, "known_companies.json")
+REGISTRY_DIR = os.path.join(DATA_DIR, "company_registry")
+CHECK_INTERVAL = float(os.getenv("COMPANY_REGISTRY_CHECK", "5"))  # Seconds between CURRENT checks
+KEEP_VERSIONS = 2  # Old versions kept on disk for workers still switching over
+
+_registry = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+class CompanyRegistry:
+    """Companies, fuzzy index and mention matcher for one registry version."""
+
+    def __init__(self, version, arrays):
+        self.version = version
+        self.index = CompanyIndex(arrays)
+        self.matcher = CompanyMatcher(arrays)
+        self.meta_blob = arrays["meta_blob"]
+        self.meta_offsets = arrays["meta_offsets"]
+
+    def __len__(self):
+        return len(self.index)
+
+    def company(self, i):
+        """Full record of company `i` (name, industry, country, ...)."""
+        raw = self.meta_blob[self.meta_offsets[i]:self.meta_offsets[i + 1]].tobytes()
+        return json.loads(raw)
+
+
+def compile_registry(companies):
+    """All registry arrays for a list of company dicts."""
+    names = [c["name"] for c in companies]
+    meta_blob, meta_offsets = _blob(json.dumps(c, ensure_ascii=False) for c in companies)
+    return {
+        **compile_index(names),
+        **compile_matcher(names),
+        "meta_blob": meta_blob,
+        "meta_offsets": meta_offsets,
+    }
+
+
+def save_registry(arrays, version, registry_dir=REGISTRY_DIR):
+    """Write a version directory, then atomically point CURRENT at it."""
+    version_dir = os.path.join(registry_dir, version)
+    tmp_dir = version_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, name + ".npy"), array)
+    os.replace(tmp_dir, version_dir)
+
+    pointer = os.path.join(registry_dir, "CURRENT")
+    with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pointer + ".tmp", pointer)
+    _prune(registry_dir, version)
+    return version_dir
+
+
+def _prune(registry_dir, current):
+    versions = sorted(
+        (d for d in os.listdir(registry_dir) if os.path.isdir(os.path.join(registry_dir, d)) and not d.endswith(".tmp")),
+        key=lambda d: os.path.getmtime(os.path.join(registry_dir, d)),
+    )
+    # Mapped files stay readable after unlinking, so workers mid-switch are unaffected
+    for old in versions[:-KEEP_VERSIONS]:
+        if old != current:
+            shutil.rmtree(os.path.join(registry_dir, old), ignore_errors=True)
+
+
+def load_registry(version, registry_dir=REGISTRY_DIR):
+    """Memory-map a compiled registry version."""
+    version_dir = os.path.join(registry_dir, version)
+    arrays = {
+        name[:-4]: np.load(os.path.join(version_dir, name), mmap_mode="r")
+        for name in os.listdir(version_dir) if name.endswith(".npy")
+    }
+    return CompanyRegistry(version, arrays)
+
+
+def _current_source():
+    """Version the registry should be at: CURRENT's contents, else the JSON file's mtime."""
+    try:
+        with open(os.path.join(REGISTRY_DIR, "CURRENT"), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        pass
+    try:
+        return f"json-{os.path.getmtime(SOURCE_PATH)}"
+    except OSError:
+        return "empty"
+
+
+def _load_source(version):
+    if not version.startswith(("json-", "empty")):
+        return load_registry(version)
+    companies = []
+    if os.path.exists(SOURCE_PATH):
+        with open(SOURCE_PATH, "r", encoding="utf-8") as f:
+            companies = json.load(f)
+    return CompanyRegistry(version, compile_registry(companies))
+
+
+def get_registry():
+    """The registry to serve, switching to a newer version if one was published."""
+    global _registry, _checked_at
+    now = time.monotonic()
+    if _registry is not None and now - _checked_at < CHECK_INTERVAL:
+        return _registry
+    with _lock:
+        if _registry is None or now - _checked_at >= CHECK_INTERVAL:
+            version = _current_source()
+            if _registry is None or version != _registry.version:
+                try:
+                    _registry = _load_source(version)  # Plain rebinding: readers see old or new, never a mix
+                except (OSError, ValueError, KeyError):
+                    if _registry is None:
+                        raise
+                    # Keep serving the loaded version; the next check retries
+            _checked_at = now
+    return _registry
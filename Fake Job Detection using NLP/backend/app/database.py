@@ -1,15 +1,65 @@
 """
 Database connection and session management.
+
+The SQLite engine runs in WAL mode by default, so readers never block the
+single writer and writers queue on a busy timeout instead of failing with
+"database is locked". Every setting can be overridden from the
+environment; bench_db.py measures the effect under mixed concurrent load.
 """
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.schema import CreateIndex
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATABASE_URL = f"sqlite:///{os.path.join(BASE_DIR, 'jobcheck.db')}"
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL").upper()  # WAL needs a local filesystem
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper()  # NORMAL is durable across app crashes in WAL mode
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "15"))  # Seconds a writer waits for the lock
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "32768"))  # Page cache per connection
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # Bytes of the file read through mmap
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+
+JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SYNCHRONOUS_LEVELS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+
+def create_sqlite_engine(url=DATABASE_URL, journal_mode=SQLITE_JOURNAL_MODE, synchronous=SQLITE_SYNCHRONOUS,
+                         busy_timeout=SQLITE_BUSY_TIMEOUT, cache_size_kb=SQLITE_CACHE_SIZE_KB,
+                         mmap_size=SQLITE_MMAP_SIZE, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW):
+    """
+    SQLite engine whose connections are shared across worker threads from a
+    pool, each set up with the given PRAGMAs when it is opened.
+    """
+    if journal_mode not in JOURNAL_MODES:
+        raise ValueError(f"Unknown SQLite journal mode: {journal_mode}")
+    if synchronous not in SYNCHRONOUS_LEVELS:
+        raise ValueError(f"Unknown SQLite synchronous level: {synchronous}")
+
+    sqlite_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": busy_timeout},
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+    )
+
+    @event.listens_for(sqlite_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={synchronous}")
+        cursor.execute(f"PRAGMA cache_size={-int(cache_size_kb)}")
+        cursor.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    return sqlite_engine
+
+
+engine = create_sqlite_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -25,5 +75,75 @@ def get_db():
 
 def init_db():
     """Create all tables."""
-    from app.models import User, Prediction, FlaggedPost, ModelVersion
+    from app.models import User, Prediction, FlaggedPost, ModelVersion, ScrapeCacheEntry, PredictionTag, DailyRollup, UserDailyRollup, UserStats, IdSequence, JobText
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+    _add_missing_indexes()
+    _rebuild_empty_rollups()
+    _rebuild_empty_user_stats()
+
+
+def _add_missing_columns():
+    """
+    create_all() never alters existing tables, so add any model columns that
+    an older database file is missing.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                has_default = column.default is not None and column.default.is_scalar
+                if not column.nullable and not has_default:
+                    continue  # SQLite cannot add a NOT NULL column without a default
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+                if has_default:
+                    ddl += f" DEFAULT {column.default.arg!r}"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+                conn.execute(text(ddl))
+
+
+def _add_missing_indexes():
+    """create_all() skips indexes on tables that already exist; add them."""
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def _rebuild_empty_rollups():
+    """
+    A database from before the rollup tables has predictions but no
+    rollups; compute them once so dashboards don't start from zero.
+    """
+    from app import rollups
+    from app.models import Prediction, DailyRollup
+    db = SessionLocal()
+    try:
+        if db.query(Prediction.id).first() is not None and db.query(DailyRollup.id).first() is None:
+            days, user_days = rollups.rebuild(db)
+            print(f"[OK] Rebuilt rollups from existing predictions: {days} daily, {user_days} per-user rows")
+    finally:
+        db.close()
+
+
+def _rebuild_empty_user_stats():
+    """Same for the per-user counters behind /api/my-stats."""
+    from app import rollups
+    from app.models import Prediction, UserFeedback, UserStats
+    db = SessionLocal()
+    try:
+        has_activity = (
+            db.query(Prediction.id).filter(Prediction.user_id.isnot(None)).first() is not None
+            or db.query(UserFeedback.id).first() is not None
+        )
+        if has_activity and db.query(UserStats.user_id).first() is None:
+            users = rollups.rebuild_user_stats(db)
+            print(f"[OK] Rebuilt counters for {users} users from existing predictions and feedback")
+    finally:
+        db.close()
@@ -14,10 +14,11 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env"))
 
+from app import write_behind
 from app.database import init_db
 from app.routes import predict, stats, flag, retrain
 from app.routes import url_scraper, bulk, feedback, company_verify
-from app.routes import user_stats, trending, ocr
+from app.routes import user_stats, trending, ocr, bulk_jobs
 from app.routes.auth_routes import router as auth_router
 
 
@@ -33,7 +34,12 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"[WARN] Model not loaded: {e}")
         print("  Run 'python ml/train.py' to train the model first.")
+    bulk_jobs.mark_interrupted_jobs()
     yield
+    bulk_jobs.shutdown_pool()
+    ocr.shutdown_pool()
+    write_behind.shutdown()
+    await url_scraper.close_client()
 
 
 app = FastAPI(
@@ -60,6 +66,7 @@ app.include_router(flag.router, prefix="/api", tags=["Flagging"])
 app.include_router(retrain.router, prefix="/api", tags=["Retrain"])
 app.include_router(url_scraper.router, prefix="/api", tags=["URL Scanner"])
 app.include_router(bulk.router, prefix="/api", tags=["Bulk Analysis"])
+app.include_router(bulk_jobs.router, prefix="/api", tags=["Bulk Analysis"])
 app.include_router(feedback.router, prefix="/api", tags=["Feedback"])
 app.include_router(company_verify.router, prefix="/api", tags=["Company Verification"])
 app.include_router(user_stats.router, prefix="/api", tags=["User Stats"])
@@ -2,7 +2,7 @@
 SQLAlchemy ORM models for JobCheck.
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Text, Date, DateTime, Boolean, ForeignKey, Index, LargeBinary, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -23,19 +23,101 @@ class User(Base):
 
 class Prediction(Base):
     __tablename__ = "predictions"
+    __table_args__ = (
+        # Keyset pagination walks (created_at, id) newest first, optionally per user or label
+        Index("ix_predictions_created_id", "created_at", "id"),
+        Index("ix_predictions_user_created", "user_id", "created_at", "id"),
+        Index("ix_predictions_label_created", "prediction", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
-    job_text = Column(Text, nullable=False)
+    job_text = Column(Text, nullable=False)  # Empty once the text lives in job_texts (see app/text_store.py)
+    text_hash = Column(String(64), ForeignKey("job_texts.hash"), nullable=True)
     prediction = Column(String(10), nullable=False)  # "Real" or "Fake"
     confidence = Column(Float, nullable=False)
     model_used = Column(String(50), default="model_a")
+    repeat_count = Column(Integer, default=1, nullable=False)  # Identical rows folded into this one (bulk dedupe)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     user = relationship("User", back_populates="predictions")
     flagged_post = relationship("FlaggedPost", back_populates="prediction", uselist=False)
 
 
+class JobText(Base):
+    """One distinct posting text, zlib-compressed, shared by every prediction of it."""
+    __tablename__ = "job_texts"
+
+    hash = Column(String(64), primary_key=True)  # SHA-256 of the UTF-8 text
+    body = Column(LargeBinary, nullable=False)
+    raw_size = Column(Integer, nullable=False)  # Uncompressed bytes
+
+
+class PredictionTag(Base):
+    """Scam pattern matched in a Fake prediction, written when it is logged."""
+    __tablename__ = "prediction_tags"
+    __table_args__ = (
+        Index("ix_prediction_tags_window", "created_at", "pattern", "keyword"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    prediction_id = Column(Integer, ForeignKey("predictions.id"), index=True, nullable=False)
+    pattern = Column(String(50), nullable=False)
+    keyword = Column(String(100), nullable=False)
+    repeat_count = Column(Integer, default=1, nullable=False)  # Copied from the prediction, like created_at
+    created_at = Column(DateTime)  # Copied from the prediction so windows need no join
+
+
+class DailyRollup(Base):
+    """Prediction counts per day, model and label, updated on every insert."""
+    __tablename__ = "daily_rollups"
+    __table_args__ = (
+        UniqueConstraint("day", "model_used", "label", name="uq_daily_rollups_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+    model_used = Column(String(50), nullable=False)
+    label = Column(String(10), nullable=False)  # "Real" or "Fake"
+    count = Column(Integer, default=0, nullable=False)
+    confidence_sum = Column(Float, default=0, nullable=False)
+
+
+class UserDailyRollup(Base):
+    """Per-user prediction counts per day and label, updated on every insert."""
+    __tablename__ = "user_daily_rollups"
+    __table_args__ = (
+        UniqueConstraint("user_id", "day", "label", name="uq_user_daily_rollups_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    day = Column(Date, nullable=False)
+    label = Column(String(10), nullable=False)
+    count = Column(Integer, default=0, nullable=False)
+    confidence_sum = Column(Float, default=0, nullable=False)
+
+
+class UserStats(Base):
+    """Lifetime counters for one user, updated with each prediction and feedback write."""
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total = Column(Integer, default=0, nullable=False)
+    fake = Column(Integer, default=0, nullable=False)
+    confidence_sum = Column(Float, default=0, nullable=False)
+    feedback_given = Column(Integer, default=0, nullable=False)
+    feedback_agree = Column(Integer, default=0, nullable=False)
+
+
+class IdSequence(Base):
+    """Next unreserved ID per table, for writers that assign IDs before inserting."""
+    __tablename__ = "id_sequences"
+
+    name = Column(String(50), primary_key=True)
+    next_id = Column(Integer, nullable=False)
+
+
 class FlaggedPost(Base):
     __tablename__ = "flagged_posts"
     
@@ -76,3 +158,17 @@ class UserFeedback(Base):
 
     prediction = relationship("Prediction")
     user = relationship("User")
+
+
+class ScrapeCacheEntry(Base):
+    __tablename__ = "scrape_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String(2048), unique=True, index=True, nullable=False)  # Canonical URL
+    title = Column(Text, default="")
+    company = Column(Text, default="")
+    text = Column(Text, nullable=False)
+    etag = Column(String(255))
+    last_modified = Column(String(64))
+    validated_at = Column(DateTime, default=datetime.utcnow)  # Last time the origin confirmed this copy
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -0,0 +1,104 @@
+"""
+OCR result cache — extracted text keyed by image content hash.
+
+Exact repeats are found by SHA-256 of the uploaded bytes. With
+OCR_CACHE_PHASH=1, a 256-bit difference hash (dHash) of the decoded image
+also matches re-encoded or resized copies within OCR_CACHE_PHASH_DISTANCE
+bits. The cache is in-process, bounded to OCR_CACHE_MAX_ENTRIES with LRU
+eviction.
+"""
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+MAX_ENTRIES = int(os.getenv("OCR_CACHE_MAX_ENTRIES", "1024"))
+USE_PHASH = os.getenv("OCR_CACHE_PHASH", "0") == "1"  # Opt-in: near-identical layouts can carry different text
+PHASH_DISTANCE = int(os.getenv("OCR_CACHE_PHASH_DISTANCE", "3"))  # Max differing bits of 256
+HASH_SIDE = 16
+MIN_HASH_BITS = 4  # Near-blank images hash to almost all zeros and would all collide
+
+_entries = OrderedDict()  # sha256 -> (dhash or None, text)
+_lock = threading.Lock()
+metrics = {"exact_hits": 0, "perceptual_hits": 0, "misses": 0, "evictions": 0}
+
+
+def content_hash(image_bytes):
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def perceptual_hash(img):
+    """
+    dHash: compare neighbouring pixels of a 17x16 grayscale thumbnail.
+    Returns None when the image is too uniform for the hash to be trusted.
+    """
+    from PIL import ImageOps
+    small = ImageOps.autocontrast(img.convert("L").resize((HASH_SIDE + 1, HASH_SIDE)))
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(HASH_SIDE):
+        for col in range(HASH_SIDE):
+            left = pixels[row * (HASH_SIDE + 1) + col]
+            right = pixels[row * (HASH_SIDE + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    ones = bin(bits).count("1")
+    if ones < MIN_HASH_BITS or ones > HASH_SIDE * HASH_SIDE - MIN_HASH_BITS:
+        return None
+    return bits
+
+
+def get(digest):
+    """Exact lookup by content hash."""
+    with _lock:
+        entry = _entries.get(digest)
+        if entry is None:
+            return None
+        _entries.move_to_end(digest)
+        metrics["exact_hits"] += 1
+        return entry[1]
+
+
+def get_similar(dhash):
+    """Perceptual lookup: text of the closest cached image within PHASH_DISTANCE bits."""
+    if not USE_PHASH or dhash is None:
+        return None
+    with _lock:
+        best_key, best_distance = None, PHASH_DISTANCE + 1
+        for key, (other, _) in _entries.items():
+            if other is None:
+                continue
+            distance = bin(dhash ^ other).count("1")
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+        if best_key is None:
+            return None
+        _entries.move_to_end(best_key)
+        metrics["perceptual_hits"] += 1
+        return _entries[best_key][1]
+
+
+def put(digest, dhash, text):
+    with _lock:
+        _entries[digest] = (dhash, text)
+        _entries.move_to_end(digest)
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+            metrics["evictions"] += 1
+
+
+def record_miss():
+    with _lock:
+        metrics["misses"] += 1
+
+
+def stats():
+    """Hit/miss counters for this worker."""
+    with _lock:
+        lookups = metrics["exact_hits"] + metrics["perceptual_hits"] + metrics["misses"]
+        hits = metrics["exact_hits"] + metrics["perceptual_hits"]
+        return {
+            **metrics,
+            "entries": len(_entries),
+            "max_entries": MAX_ENTRIES,
+            "hit_rate": round(hits / lookups * 100, 1) if lookups else 0,
+        }
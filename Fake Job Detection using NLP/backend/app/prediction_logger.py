@@ -0,0 +1,229 @@
+"""
+Prediction logging.
+
+log_prediction() writes a single prediction; BulkPredictionLogger buffers
+rows for bulk and batch scoring paths and writes them with executemany-style
+Core INSERTs, one bounded transaction per batch, instead of one ORM object
+per row. Both also write the rows derived from each prediction (scam
+pattern tags, daily rollups) in the same transaction. Posting text goes to
+the deduplicated job_texts table (app/text_store.py), not the row itself.
+
+With PREDICTION_WRITE_BEHIND=1 scoring routes queue rows through
+app/write_behind.py, which hands out IDs before the rows exist. Every
+writer then takes its IDs from reserve_ids() so none of them collide.
+"""
+import os
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app import rollups, stats_cache, text_store
+from app.models import Prediction, PredictionTag, IdSequence
+from app.scam_patterns import tag_rows
+
+DEFAULT_BATCH_SIZE = 1000
+WRITE_BEHIND = os.getenv("PREDICTION_WRITE_BEHIND", "0") == "1"  # Must match across workers sharing a database
+
+
+def reserve_ids(db, count):
+    """
+    Reserve `count` consecutive prediction IDs and return the first. The
+    reservation is part of the caller's transaction and always starts above
+    the highest existing ID.
+    """
+    floor = select(func.coalesce(func.max(Prediction.id), 0) + 1).scalar_subquery()
+    stmt = sqlite_insert(IdSequence).values(name="predictions", next_id=floor + count)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["name"],
+        set_={"next_id": func.max(IdSequence.next_id, floor) + count},
+    ).returning(IdSequence.next_id)
+    return db.scalar(stmt) - count
+
+
+def is_reserved(db, prediction_id):
+    """Whether `prediction_id` has been handed out by reserve_ids(), written yet or not."""
+    next_id = db.scalar(select(IdSequence.next_id).where(IdSequence.name == "predictions"))
+    return next_id is not None and 0 < prediction_id < next_id
+
+
+def _with_stored_text(db, rows):
+    """Copies of prediction row dicts for INSERT, their text moved to job_texts."""
+    hashes = text_store.store(db, [row["job_text"] for row in rows])
+    return [{**row, "job_text": "", "text_hash": h} for row, h in zip(rows, hashes)]
+
+
+def _write_derived_rows(db, rows, ids=None):
+    """
+    Write the rows derived from prediction row dicts, uncommitted. `ids`
+    (the new primary keys) is required when any row is Fake.
+    """
+    rollups.record(db, rows)
+    if ids is not None:
+        tags = tag_rows(zip(ids, rows))
+        if tags:
+            db.execute(insert(PredictionTag), tags)
+
+
+def write_rows(db: Session, rows):
+    """Insert and commit prediction row dicts that already carry their IDs, with derived rows."""
+    try:
+        db.execute(insert(Prediction), _with_stored_text(db, rows))
+        _write_derived_rows(db, rows, [row["id"] for row in rows])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    stats_cache.invalidate()
+
+
+def log_prediction(db: Session, job_text, prediction, confidence, user_id=None, model_used="model_a",
+                   created_at=None, max_length=5000, prediction_id=None):
+    """Insert and commit one prediction with its derived rows. Returns the refreshed record."""
+    if prediction_id is None and WRITE_BEHIND:
+        prediction_id = reserve_ids(db, 1)
+    job_text = job_text[:max_length]
+    record = Prediction(
+        id=prediction_id,
+        user_id=user_id,
+        job_text="",
+        prediction=prediction,
+        confidence=confidence,
+        model_used=model_used,
+        created_at=created_at or datetime.now(timezone.utc),
+    )
+    db.add(record)
+    try:
+        record.text_hash = text_store.store(db, [job_text])[0]
+        db.flush()
+        row = {
+            "user_id": record.user_id,
+            "job_text": job_text,
+            "prediction": record.prediction,
+            "confidence": record.confidence,
+            "model_used": record.model_used,
+            "created_at": record.created_at,
+        }
+        _write_derived_rows(db, [row], [record.id])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    stats_cache.invalidate()
+    db.refresh(record)
+    return record
+
+
+class BulkPredictionLogger:
+    """
+    Buffer prediction rows and insert them in batches of `batch_size`.
+
+    Each batch is committed on its own, so a large upload never sits in a
+    single transaction. When `return_ids` is set, inserted primary keys are
+    collected in `inserted_ids` in the order rows were added.
+
+    Rows added with a `dedupe_key` that matches a row still buffered are
+    folded into it by raising its repeat_count, so every row is inserted
+    with the count it stands for and rollups, user counters and tags are
+    weighted by it from the start. A key seen again after its row was
+    flushed starts a new row.
+    """
+
+    def __init__(self, db: Session, batch_size: int = DEFAULT_BATCH_SIZE, return_ids: bool = False):
+        self.db = db
+        self.batch_size = batch_size
+        self.return_ids = return_ids
+        self.inserted_ids = []
+        self.rows_logged = 0
+        self.batches = 0
+        self.elapsed = 0.0
+        self._pending = []
+        self._pending_keys = {}  # dedupe_key -> buffered row
+
+    def add(self, job_text, prediction, confidence, user_id=None, model_used="model_a",
+            created_at=None, repeat_count=1, dedupe_key=None):
+        """Queue one prediction row, flushing when the batch is full."""
+        if dedupe_key is not None and dedupe_key in self._pending_keys:
+            self._pending_keys[dedupe_key]["repeat_count"] += repeat_count
+            return
+        row = {
+            "user_id": user_id,
+            "job_text": job_text[:5000],
+            "prediction": prediction,
+            "confidence": confidence,
+            "model_used": model_used,
+            "created_at": created_at or datetime.now(timezone.utc),
+            "repeat_count": repeat_count,
+        }
+        self._pending.append(row)
+        if dedupe_key is not None:
+            self._pending_keys[dedupe_key] = row
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Insert and commit all queued rows. Returns the new IDs if requested."""
+        if not self._pending:
+            return []
+
+        rows, self._pending = self._pending, []
+        self._pending_keys = {}
+        started = time.perf_counter()
+        ids = []
+        # Tags need the new IDs, so fetch them whenever a Fake row is present
+        need_ids = self.return_ids or any(row["prediction"] == "Fake" for row in rows)
+        try:
+            if WRITE_BEHIND:
+                first = reserve_ids(self.db, len(rows))
+                ids = list(range(first, first + len(rows)))
+                for row, pid in zip(rows, ids):
+                    row["id"] = pid
+                self.db.execute(insert(Prediction), _with_stored_text(self.db, rows))
+                _write_derived_rows(self.db, rows, ids)
+            elif need_ids:
+                stmt = insert(Prediction).returning(Prediction.id, sort_by_parameter_order=True)
+                ids = list(self.db.scalars(stmt, _with_stored_text(self.db, rows)))
+                _write_derived_rows(self.db, rows, ids)
+            else:
+                self.db.execute(insert(Prediction), _with_stored_text(self.db, rows))
+                _write_derived_rows(self.db, rows)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        finally:
+            self.elapsed += time.perf_counter() - started
+
+        stats_cache.invalidate()
+        self.rows_logged += len(rows)
+        self.batches += 1
+        if not self.return_ids:
+            return []
+        self.inserted_ids.extend(ids)
+        return ids
+
+    @property
+    def rows_per_second(self):
+        return round(self.rows_logged / self.elapsed, 1) if self.elapsed > 0 else 0
+
+    def stats(self):
+        """Summary of what has been written so far."""
+        return {
+            "rows_logged": self.rows_logged,
+            "batches": self.batches,
+            "seconds": round(self.elapsed, 4),
+            "rows_per_second": self.rows_per_second,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        else:
+            self._pending = []
+            self._pending_keys = {}
+        return False
@@ -0,0 +1,72 @@
+"""
+Shared query fragments for listing endpoints.
+"""
+import base64
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import func, select, tuple_
+
+from app import text_store
+from app.models import JobText, Prediction
+
+PREVIEW_LENGTH = 200
+
+
+def job_text_preview(length=PREVIEW_LENGTH):
+    """
+    Columns (inline_text, stored_text) a listing needs to show a preview:
+    the compressed text from job_texts by primary key, or for rows not yet
+    migrated the first `length` + 1 characters of job_text.
+    """
+    return (
+        func.substr(Prediction.job_text, 1, length + 1).label("inline_text"),
+        select(JobText.body).where(JobText.hash == Prediction.text_hash).scalar_subquery().label("stored_text"),
+    )
+
+
+def row_text(row):
+    """Posting text of a row selected with job_text_preview(), decompressed if stored."""
+    if row.stored_text is not None:
+        return text_store.decompress(row.stored_text)
+    return row.inline_text or ""
+
+
+def preview_text(row, length=PREVIEW_LENGTH):
+    """Preview as shown in listings: cut text gets a trailing '...'."""
+    text = row_text(row)
+    return text[:length] + "..." if len(text) > length else text
+
+
+def encode_cursor(created_at, row_id):
+    """Opaque cursor for the row a page ended on."""
+    raw = f"{created_at.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def newest_first_page(query, cursor, limit, skip=0):
+    """
+    One page of a Prediction query, newest first by (created_at, id).
+    With a cursor the page starts right after it (keyset); without one,
+    `skip` rows are skipped as before. Returns (rows, next_cursor).
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(Prediction.created_at, Prediction.id) < tuple_(created_at, row_id))
+    query = query.order_by(Prediction.created_at.desc(), Prediction.id.desc())
+    if skip and not cursor:
+        query = query.offset(skip)
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
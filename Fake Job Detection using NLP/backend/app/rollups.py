@@ -0,0 +1,157 @@
+"""
+Daily rollups and per-user counters — prediction counts kept up to date as
+predictions (and, for users, feedback) are logged.
+
+Each insert batch is summed in Python and applied with one upsert per
+table (INSERT ... ON CONFLICT DO UPDATE count = count + excluded.count),
+so dashboards read a few rows per day, or one row per user, instead of
+scanning predictions. A prediction counts repeat_count times, since a
+dedupe-logged bulk row stands for that many identical postings.
+`python backfill.py rollups` rebuilds the daily tables and
+`python backfill.py user-stats` checks and rebuilds the per-user counters.
+"""
+from collections import defaultdict
+
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.models import Prediction, DailyRollup, UserDailyRollup, UserStats, UserFeedback
+
+USER_COUNTERS = ("total", "fake", "confidence_sum", "feedback_given", "feedback_agree")
+
+
+def _increment(db, table, keys, rows):
+    """Upsert row dicts, adding their non-key values onto any existing row."""
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={
+            column: getattr(table, column) + stmt.excluded[column]
+            for column in rows[0] if column not in keys
+        },
+    )
+    db.execute(stmt, rows)
+
+
+def record(db, rows):
+    """Add prediction row dicts to the rollup tables and user counters (uncommitted)."""
+    daily = defaultdict(lambda: [0, 0.0])
+    per_user = defaultdict(lambda: [0, 0.0])
+    for row in rows:
+        day = row["created_at"].date()
+        weight = row.get("repeat_count") or 1
+        key = (day, row.get("model_used") or "model_a", row["prediction"])
+        daily[key][0] += weight
+        daily[key][1] += row["confidence"] * weight
+        if row.get("user_id") is not None:
+            user_key = (row["user_id"], day, row["prediction"])
+            per_user[user_key][0] += weight
+            per_user[user_key][1] += row["confidence"] * weight
+
+    if daily:
+        _increment(db, DailyRollup, ["day", "model_used", "label"], [
+            {"day": day, "model_used": model, "label": label, "count": count, "confidence_sum": conf}
+            for (day, model, label), (count, conf) in daily.items()
+        ])
+    if per_user:
+        _increment(db, UserDailyRollup, ["user_id", "day", "label"], [
+            {"user_id": user_id, "day": day, "label": label, "count": count, "confidence_sum": conf}
+            for (user_id, day, label), (count, conf) in per_user.items()
+        ])
+        counters = defaultdict(lambda: dict.fromkeys(USER_COUNTERS, 0))
+        for (user_id, _, label), (count, conf) in per_user.items():
+            counters[user_id]["total"] += count
+            counters[user_id]["fake"] += count if label == "Fake" else 0
+            counters[user_id]["confidence_sum"] += conf
+        _increment(db, UserStats, ["user_id"], [{"user_id": uid, **c} for uid, c in counters.items()])
+
+
+def record_feedback(db, user_id, previous, feedback):
+    """
+    Count a feedback write in the user's counters (uncommitted). `previous`
+    is the value being replaced, or None for a new feedback entry.
+    """
+    delta = dict.fromkeys(USER_COUNTERS, 0)
+    delta["feedback_given"] = 1 if previous is None else 0
+    delta["feedback_agree"] = (feedback == "agree") - (previous == "agree")
+    _increment(db, UserStats, ["user_id"], [{"user_id": user_id, **delta}])
+
+
+def rebuild(db):
+    """Recompute both rollup tables from the predictions table. Returns row counts."""
+    day = func.date(Prediction.created_at)
+    model_used = func.coalesce(Prediction.model_used, "model_a")
+    count = func.sum(Prediction.repeat_count)
+    confidence_sum = func.sum(Prediction.confidence * Prediction.repeat_count)
+    db.execute(delete(DailyRollup))
+    db.execute(delete(UserDailyRollup))
+    db.execute(insert(DailyRollup).from_select(
+        ["day", "model_used", "label", "count", "confidence_sum"],
+        select(day, model_used, Prediction.prediction, count, confidence_sum)
+        .group_by(day, model_used, Prediction.prediction),
+    ))
+    db.execute(insert(UserDailyRollup).from_select(
+        ["user_id", "day", "label", "count", "confidence_sum"],
+        select(Prediction.user_id, day, Prediction.prediction, count, confidence_sum)
+        .where(Prediction.user_id.isnot(None))
+        .group_by(Prediction.user_id, day, Prediction.prediction),
+    ))
+    db.commit()
+    return (
+        db.scalar(select(func.count(DailyRollup.id))),
+        db.scalar(select(func.count(UserDailyRollup.id))),
+    )
+
+
+def _expected_user_stats(db):
+    """{user_id: counters} recomputed from predictions and user_feedback."""
+    expected = defaultdict(lambda: dict.fromkeys(USER_COUNTERS, 0))
+    for r in db.execute(
+        select(
+            Prediction.user_id,
+            func.sum(Prediction.repeat_count),
+            func.sum(case((Prediction.prediction == "Fake", Prediction.repeat_count), else_=0)),
+            func.sum(Prediction.confidence * Prediction.repeat_count),
+        )
+        .where(Prediction.user_id.isnot(None))
+        .group_by(Prediction.user_id)
+    ):
+        expected[r[0]].update(total=r[1], fake=r[2], confidence_sum=r[3])
+    for r in db.execute(
+        select(
+            UserFeedback.user_id,
+            func.count(UserFeedback.id),
+            func.sum(case((UserFeedback.feedback == "agree", 1), else_=0)),
+        )
+        .group_by(UserFeedback.user_id)
+    ):
+        expected[r[0]].update(feedback_given=r[1], feedback_agree=r[2])
+    return expected
+
+
+def check_user_stats(db):
+    """User IDs whose stored counters differ from a recount."""
+    expected = _expected_user_stats(db)
+    stored = {s.user_id: s for s in db.query(UserStats)}
+    drifted = []
+    for user_id in expected.keys() | stored.keys():
+        want, have = expected.get(user_id), stored.get(user_id)
+        if want is None or have is None:
+            drifted.append(user_id)
+            continue
+        for column in USER_COUNTERS:
+            # confidence_sum accumulates float additions in a different order
+            if abs(getattr(have, column) - want[column]) > 1e-6:
+                drifted.append(user_id)
+                break
+    return sorted(drifted)
+
+
+def rebuild_user_stats(db):
+    """Recompute every user's counters. Returns the number of users written."""
+    expected = _expected_user_stats(db)
+    db.execute(delete(UserStats))
+    if expected:
+        db.execute(insert(UserStats), [{"user_id": uid, **c} for uid, c in expected.items()])
+    db.commit()
+    return len(expected)
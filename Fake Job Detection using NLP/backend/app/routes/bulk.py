@@ -1,9 +1,23 @@
 """
-Bulk CSV analysis endpoint — upload a CSV of job postings and get batch results.
+Bulk analysis endpoint — upload a file of job postings and get batch results.
+
+Accepts CSV, JSONL (either optionally gzip-compressed) and Parquet.
+
+Uploads are parsed incrementally from the spooled upload file and scored in
+fixed-size chunks, so memory use stays flat regardless of how many rows the
+file contains. Repeated postings within an upload are scored once.
 """
 import io
 import csv
-from datetime import datetime, timezone
+import gzip
+import json
+import zlib
+import codecs
+import hashlib
+import itertools
+import shutil
+import tempfile
+from collections import Counter, namedtuple
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
@@ -11,186 +25,407 @@ from sqlalchemy.orm import Session
 from app.database import get_db
 from app.auth import get_current_user
 from app.routes.predict import get_model, preprocess_text
-from app.models import Prediction
+from app.prediction_logger import BulkPredictionLogger
 
 router = APIRouter()
 
-MAX_ROWS = 500  # Limit to prevent abuse
+CHUNK_SIZE = 256  # Rows vectorised and scored per model call
+MAX_RESULT_ROWS = 500  # Per-row results echoed back in the JSON response
+MAX_DEDUPE_ENTRIES = 200_000  # Distinct texts remembered per upload
+TEXT_COLUMN_CANDIDATES = ["job_text", "text", "description", "job_description", "posting", "content"]
+SUPPORTED_FORMATS = (".csv.gz", ".jsonl.gz", ".csv", ".jsonl", ".parquet")
+# Raised while reading a corrupt, truncated or mislabelled upload
+UNREADABLE_UPLOAD_ERRORS = (gzip.BadGzipFile, EOFError, zlib.error, csv.Error)
+
+
+def _latin1_fallback(error):
+    """Decode bytes that are not valid UTF-8 as Latin-1 instead of failing."""
+    return error.object[error.start:error.end].decode("latin-1"), error.end
+
+
+codecs.register_error("jobcheck-latin1", _latin1_fallback)
+
+
+def _open_text(binary):
+    """Wrap a binary stream in a streaming text reader with encoding fallback."""
+    return io.TextIOWrapper(binary, encoding="utf-8-sig", errors="jobcheck-latin1", newline="")
+
+
+def _find_text_column(fieldnames):
+    """Pick the column holding the posting text (try common names)."""
+    for candidate in TEXT_COLUMN_CANDIDATES:
+        for col in fieldnames:
+            if col.strip().lower() == candidate:
+                return col
+    # Fallback: use first column
+    return fieldnames[0]
+
+
+def _detect_format(filename):
+    """Return the supported suffix an upload's filename ends with."""
+    name = (filename or "").lower()
+    for suffix in SUPPORTED_FORMATS:
+        if name.endswith(suffix):
+            return suffix
+    raise HTTPException(
+        status_code=400,
+        detail="Unsupported file type. Use .csv, .csv.gz, .jsonl, .jsonl.gz or .parquet",
+    )
+
+
+class UploadRows:
+    """
+    Iterates the posting-text column of an uploaded file as plain strings.
+
+    CSV and JSONL (optionally gzip-compressed) are decoded as a stream;
+    Parquet is read in record batches of only the text column. `close()`
+    releases the wrappers but leaves the underlying binary file open.
+
+    A file that turns out not to be valid gzip or CSV raises a 400
+    HTTPException, whether that shows up on opening or part-way through.
+    """
+
+    def __init__(self, binary, fmt):
+        binary.seek(0)
+        self.fmt = fmt
+        self._gzip = gzip.GzipFile(fileobj=binary, mode="rb") if fmt.endswith(".gz") else None
+        self._text = None
+        source = self._gzip or binary
+
+        try:
+            if fmt == ".parquet":
+                self._open_parquet(source)
+            elif fmt.startswith(".jsonl"):
+                self._open_jsonl(source)
+            else:
+                self._open_csv(source)
+        except UNREADABLE_UPLOAD_ERRORS as e:
+            self.close()
+            raise self._unreadable(e)
+
+    def _open_csv(self, source):
+        self._text = _open_text(source)
+        reader = csv.reader(self._text)
+        header = next(reader, None)
+        if not header:
+            self.close()
+            raise HTTPException(status_code=400, detail="CSV has no headers")
+        self.text_col = _find_text_column(header)
+        index = header.index(self.text_col)
+        self._values = (row[index] if len(row) > index else "" for row in reader)
+
+    def _open_jsonl(self, source):
+        self._text = _open_text(source)
+        lines = (line for line in self._text if line.strip())
+        first = next(lines, None)
+        record = self._parse_json(first) if first is not None else None
+        if not record:
+            self.close()
+            raise HTTPException(status_code=400, detail="JSONL file has no records")
+        self.text_col = _find_text_column(list(record))
+        self._values = itertools.chain(
+            [record.get(self.text_col)],
+            ((self._parse_json(line) or {}).get(self.text_col) for line in lines),
+        )
+
+    def _open_parquet(self, source):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise HTTPException(status_code=400, detail="Parquet uploads require the pyarrow package")
+        try:
+            parquet = pq.ParquetFile(source)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Could not read Parquet file: {str(e)}")
+        self.text_col = _find_text_column(parquet.schema_arrow.names)
+        self._values = (
+            value
+            for batch in parquet.iter_batches(batch_size=CHUNK_SIZE, columns=[self.text_col])
+            for value in batch.column(0).to_pylist()
+        )
+
+    @staticmethod
+    def _parse_json(line):
+        """Parse one JSONL record; malformed lines count as empty rows."""
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        return record if isinstance(record, dict) else None
+
+    def _unreadable(self, error):
+        kind = "gzip-compressed " if self.fmt.endswith(".gz") else ""
+        return HTTPException(status_code=400, detail=f"Could not read {kind}upload: {error or type(error).__name__}")
+
+    def __iter__(self):
+        try:
+            for value in self._values:
+                yield "" if value is None else str(value).strip()
+        except UNREADABLE_UPLOAD_ERRORS as e:
+            raise self._unreadable(e)
+
+    def close(self):
+        if self._text is not None:
+            self._text.detach()
+            self._text = None
+        if self._gzip is not None:
+            self._gzip.close()
+            self._gzip = None
+
+
+def _iter_chunks(rows, size=CHUNK_SIZE):
+    """Yield lists of (row_number, job_text) from UploadRows, `size` rows at a time."""
+    chunk = []
+    for i, job_text in enumerate(rows):
+        chunk.append((i + 1, job_text))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+ScoredRow = namedtuple("ScoredRow", "row job_text prediction confidence reason key duplicate")
+
+
+def _text_key(job_text):
+    """Hash of the case- and whitespace-normalised text, used to spot repeats."""
+    normalised = " ".join(job_text.lower().split())
+    return hashlib.blake2b(normalised.encode("utf-8"), digest_size=16).digest()
+
+
+class BulkScorer:
+    """
+    Scores chunks of (row_number, job_text) pairs, running each distinct
+    normalised text through the model only once per upload. Repeats reuse the
+    first result and are marked `duplicate`.
+    """
+
+    def __init__(self, model, vectorizer, max_entries=MAX_DEDUPE_ENTRIES):
+        self.model = model
+        self.vectorizer = vectorizer
+        self.max_entries = max_entries
+        self.counts = Counter()  # key -> rows seen with that text
+        self.rows_scored = 0  # rows that went through the model
+        self.rows_reused = 0  # rows answered from an earlier identical text
+        self._results = {}  # key -> (prediction, confidence, reason)
+        self._chunk_results = {}  # Overflow once _results is full
+
+    def score(self, chunk):
+        """Score one chunk. Returns a ScoredRow per input pair, in order."""
+        scored = [None] * len(chunk)
+        pending = {}  # key -> positions waiting on a model result
+        clean_texts = []
+        keys = []
+
+        for pos, (row_num, job_text) in enumerate(chunk):
+            if not job_text or len(job_text) < 10:
+                scored[pos] = ScoredRow(row_num, job_text, "Skipped", 0, "Text too short", None, False)
+                continue
+
+            key = _text_key(job_text)
+            if key in self.counts or len(self.counts) < self.max_entries:
+                self.counts[key] += 1
+
+            if key in self._results:
+                scored[pos] = ScoredRow(row_num, job_text, *self._results[key], key, True)
+                self.rows_reused += 1
+                continue
+            if key in pending:
+                pending[key].append(pos)
+                self.rows_reused += 1
+                continue
+
+            pending[key] = [pos]
+            clean_text = preprocess_text(job_text)
+            if not clean_text.strip():
+                self._remember(key, ("Skipped", 0, "Empty after preprocessing"))
+                continue
+            clean_texts.append(clean_text)
+            keys.append(key)
+
+        if clean_texts:
+            features = self.vectorizer.transform(clean_texts)
+            labels = self.model.predict(features)
+            if hasattr(self.model, 'predict_proba'):
+                confidences = self.model.predict_proba(features).max(axis=1)
+            else:
+                confidences = [0.85] * len(clean_texts)
+            self.rows_scored += len(clean_texts)
+
+            for key, label, confidence in zip(keys, labels, confidences):
+                result = "Fake" if label == 1 else "Real"
+                self._remember(key, (result, float(confidence), None))
+
+        # Fan results out to every row that shared a text in this chunk
+        for key, positions in pending.items():
+            outcome = self._results.get(key) or self._chunk_results.pop(key)
+            for i, pos in enumerate(positions):
+                row_num, job_text = chunk[pos]
+                scored[pos] = ScoredRow(row_num, job_text, *outcome, key, i > 0)
+        self._chunk_results = {}
+
+        return scored
+
+    def _remember(self, key, outcome):
+        if len(self._results) < self.max_entries:
+            self._results[key] = outcome
+        else:
+            self._chunk_results[key] = outcome
+
+    def stats(self):
+        """Deduplication summary for the upload so far."""
+        total = self.rows_scored + self.rows_reused
+        return {
+            "unique_postings": len(self.counts),
+            "duplicate_rows": self.rows_reused,
+            "model_rows_scored": self.rows_scored,
+            "compute_saved_pct": round(self.rows_reused / total * 100, 1) if total > 0 else 0,
+        }
+
+
+def _log_scored_row(logger, scored, user_id, dedupe_log):
+    """
+    Queue a scored row for the database. With `dedupe_log`, copies of a text
+    are folded into one logged row whose repeat_count says how many rows it
+    stands for (see BulkPredictionLogger).
+    """
+    logger.add(
+        scored.job_text, scored.prediction, round(scored.confidence, 4), user_id=user_id,
+        dedupe_key=scored.key if dedupe_log else None,
+    )
 
 
 @router.post("/predict-bulk")
-async def predict_bulk(
+def predict_bulk(
     file: UploadFile = File(...),
+    dedupe_log: bool = False,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
-    """Analyze multiple job postings from a CSV file."""
-    if not file.filename.endswith(".csv"):
-        raise HTTPException(status_code=400, detail="Only CSV files are supported")
-
-    content = await file.read()
-    try:
-        text_content = content.decode("utf-8")
-    except UnicodeDecodeError:
-        text_content = content.decode("latin-1")
-
-    reader = csv.DictReader(io.StringIO(text_content))
-    if not reader.fieldnames:
-        raise HTTPException(status_code=400, detail="CSV has no headers")
-
-    # Find the text column (try common names)
-    text_col = None
-    for candidate in ["job_text", "text", "description", "job_description", "posting", "content"]:
-        for col in reader.fieldnames:
-            if col.strip().lower() == candidate:
-                text_col = col
-                break
-        if text_col:
-            break
-
-    if not text_col:
-        # Fallback: use first column
-        text_col = reader.fieldnames[0]
-
+    """
+    Analyze multiple job postings from a CSV, JSONL or Parquet file.
+    Set `dedupe_log` to log repeated postings once, with a repeat count.
+
+    A plain def, so FastAPI runs the whole parse/score/log loop in its
+    threadpool instead of blocking the event loop for large uploads.
+    """
+    fmt = _detect_format(file.filename)
     model, vectorizer = get_model()
+    rows = UploadRows(file.file, fmt)
     user_id = current_user.id if current_user else None
+    scorer = BulkScorer(model, vectorizer)
+    logger = BulkPredictionLogger(db)
 
     results = []
     total_fake = 0
     total_real = 0
+    total_skipped = 0
 
-    for i, row in enumerate(reader):
-        if i >= MAX_ROWS:
-            break
-
-        job_text = row.get(text_col, "").strip()
-        if not job_text or len(job_text) < 10:
-            results.append({
-                "row": i + 1,
-                "preview": job_text[:100] if job_text else "(empty)",
-                "prediction": "Skipped",
-                "confidence": 0,
-                "reason": "Text too short",
-            })
-            continue
-
-        clean_text = preprocess_text(job_text)
-        if not clean_text.strip():
-            results.append({
-                "row": i + 1,
-                "preview": job_text[:100],
-                "prediction": "Skipped",
-                "confidence": 0,
-                "reason": "Empty after preprocessing",
-            })
-            continue
-
-        features = vectorizer.transform([clean_text])
-        prediction_label = model.predict(features)[0]
-
-        if hasattr(model, 'predict_proba'):
-            probas = model.predict_proba(features)[0]
-            confidence = float(max(probas))
-        else:
-            confidence = 0.85
-
-        result = "Fake" if prediction_label == 1 else "Real"
-
-        if result == "Fake":
-            total_fake += 1
-        else:
-            total_real += 1
-
-        # Log to database
-        record = Prediction(
-            user_id=user_id,
-            job_text=job_text[:5000],
-            prediction=result,
-            confidence=round(confidence, 4),
-            created_at=datetime.now(timezone.utc),
-        )
-        db.add(record)
-
-        results.append({
-            "row": i + 1,
-            "preview": job_text[:100] + "..." if len(job_text) > 100 else job_text,
-            "prediction": result,
-            "confidence": round(confidence * 100, 2),
-        })
-
-    db.commit()
+    try:
+        for chunk in _iter_chunks(rows):
+            for scored in scorer.score(chunk):
+                job_text = scored.job_text
+                if scored.prediction == "Skipped":
+                    total_skipped += 1
+                    if len(results) < MAX_RESULT_ROWS:
+                        results.append({
+                            "row": scored.row,
+                            "preview": job_text[:100] if job_text else "(empty)",
+                            "prediction": "Skipped",
+                            "confidence": 0,
+                            "reason": scored.reason,
+                        })
+                    continue
+
+                if scored.prediction == "Fake":
+                    total_fake += 1
+                else:
+                    total_real += 1
+
+                # Log to database (batched)
+                _log_scored_row(logger, scored, user_id, dedupe_log)
+
+                if len(results) < MAX_RESULT_ROWS:
+                    results.append({
+                        "row": scored.row,
+                        "preview": job_text[:100] + "..." if len(job_text) > 100 else job_text,
+                        "prediction": scored.prediction,
+                        "confidence": round(scored.confidence * 100, 2),
+                    })
+
+        logger.flush()
+    finally:
+        rows.close()
 
     total = total_fake + total_real
     return {
         "total_analyzed": total,
         "total_fake": total_fake,
         "total_real": total_real,
+        "total_skipped": total_skipped,
         "fraud_rate": round((total_fake / total) * 100, 1) if total > 0 else 0,
         "results": results,
+        "results_truncated": total + total_skipped > len(results),
+        "deduplication": scorer.stats(),
+        "db_logging": logger.stats(),
     }
 
 
-@router.post("/predict-bulk/download")
-async def predict_bulk_download(
-    file: UploadFile = File(...),
-    current_user=Depends(get_current_user),
-):
-    """Analyze CSV and return results as a downloadable CSV."""
-    if not file.filename.endswith(".csv"):
-        raise HTTPException(status_code=400, detail="Only CSV files are supported")
+def _iter_result_csv(spool, rows, model, vectorizer):
+    """Generate the results CSV one chunk at a time, then drop the spooled upload."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
 
-    content = await file.read()
-    try:
-        text_content = content.decode("utf-8")
-    except UnicodeDecodeError:
-        text_content = content.decode("latin-1")
+    def drain():
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return data.encode("utf-8")
 
-    reader = csv.DictReader(io.StringIO(text_content))
-    if not reader.fieldnames:
-        raise HTTPException(status_code=400, detail="CSV has no headers")
+    try:
+        writer.writerow(["Row", "Text Preview", "Prediction", "Confidence (%)"])
+        yield drain()
+
+        scorer = BulkScorer(model, vectorizer)
+        for chunk in _iter_chunks(rows):
+            for scored in scorer.score(chunk):
+                if scored.prediction == "Skipped":
+                    writer.writerow([scored.row, scored.job_text[:100], "Skipped", "0"])
+                else:
+                    writer.writerow([scored.row, scored.job_text[:100], scored.prediction,
+                                     round(scored.confidence * 100, 2)])
+            yield drain()
+    finally:
+        rows.close()
+        spool.close()
 
-    text_col = None
-    for candidate in ["job_text", "text", "description", "job_description", "posting", "content"]:
-        for col in reader.fieldnames:
-            if col.strip().lower() == candidate:
-                text_col = col
-                break
-        if text_col:
-            break
-    if not text_col:
-        text_col = reader.fieldnames[0]
 
+@router.post("/predict-bulk/download")
+def predict_bulk_download(
+    file: UploadFile = File(...),
+    current_user=Depends(get_current_user),
+):
+    """
+    Analyze an upload and return results as a downloadable CSV. Runs in the
+    threadpool (plain def) since copying and opening the upload block; the
+    sync result generator is iterated off the event loop by Starlette.
+    """
+    fmt = _detect_format(file.filename)
     model, vectorizer = get_model()
 
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["Row", "Text Preview", "Prediction", "Confidence (%)"])
-
-    for i, row in enumerate(reader):
-        if i >= MAX_ROWS:
-            break
-        job_text = row.get(text_col, "").strip()
-        if not job_text or len(job_text) < 10:
-            writer.writerow([i + 1, job_text[:100], "Skipped", "0"])
-            continue
-
-        clean_text = preprocess_text(job_text)
-        if not clean_text.strip():
-            writer.writerow([i + 1, job_text[:100], "Skipped", "0"])
-            continue
-
-        features = vectorizer.transform([clean_text])
-        pred = model.predict(features)[0]
-        if hasattr(model, 'predict_proba'):
-            conf = float(max(model.predict_proba(features)[0]))
-        else:
-            conf = 0.85
-        result = "Fake" if pred == 1 else "Real"
-        writer.writerow([i + 1, job_text[:100], result, round(conf * 100, 2)])
+    # The upload is closed as soon as this handler returns, so give the
+    # response generator its own disk-backed copy to read from.
+    spool = tempfile.TemporaryFile()
+    shutil.copyfileobj(file.file, spool)
+    try:
+        rows = UploadRows(spool, fmt)
+    except HTTPException:
+        spool.close()
+        raise
 
-    output.seek(0)
     return StreamingResponse(
-        io.BytesIO(output.getvalue().encode()),
+        _iter_result_csv(spool, rows, model, vectorizer),
         media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=bulk_results.csv"},
     )
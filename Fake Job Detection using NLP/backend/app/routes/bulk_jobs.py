@@ -0,0 +1,395 @@
+"""
+Asynchronous bulk analysis jobs — upload a file, poll progress, fetch results.
+
+Each job lives in its own directory under data/bulk_jobs/:
+    input.<ext>     the uploaded file, suffix kept (.csv, .jsonl.gz, ...)
+    status.json     state, progress counters and page offsets
+    results.jsonl   one scored row per line
+
+Scoring runs in a process pool, so large files neither hold a web worker nor
+depend on the client staying connected. Finished jobs are deleted after
+BULK_JOB_RETENTION_HOURS (checked at startup and whenever a job is created).
+"""
+import os
+import csv
+import io
+import json
+import time
+import uuid
+import asyncio
+import shutil
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.auth import get_current_user
+from app.routes import bulk
+
+router = APIRouter()
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+JOBS_DIR = os.path.join(BACKEND_DIR, "data", "bulk_jobs")
+MAX_WORKERS = int(os.getenv("BULK_JOB_WORKERS", "2"))
+PROGRESS_INTERVAL = 0.5  # Seconds between status.json updates while running
+PAGE_STRIDE = 1000  # Rows between recorded byte offsets in results.jsonl
+MAX_PAGE_SIZE = 1000
+RETENTION_SECONDS = float(os.getenv("BULK_JOB_RETENTION_HOURS", "72")) * 3600
+
+_pool = None
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # spawn: forking a process that runs an event loop is not safe
+        _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _submit(job_dir):
+    """Queue a job, replacing the pool if a crashed worker (e.g. OOM) broke it."""
+    global _pool
+    try:
+        return _get_pool().submit(run_bulk_job, job_dir)
+    except BrokenProcessPool:
+        broken, _pool = _pool, None
+        broken.shutdown(wait=False, cancel_futures=True)
+        return _get_pool().submit(run_bulk_job, job_dir)
+
+
+def shutdown_pool():
+    """Stop the worker pool (called on application shutdown)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _job_dir(job_id):
+    return os.path.join(JOBS_DIR, job_id)
+
+
+def _read_status(job_dir):
+    with open(os.path.join(job_dir, "status.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_status(job_dir, status):
+    """Atomically replace status.json so readers never see a partial file."""
+    path = os.path.join(job_dir, "status.json")
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(status, f)
+    os.replace(tmp, path)
+
+
+def _update_status(job_dir, **changes):
+    status = _read_status(job_dir)
+    status.update(changes)
+    _write_status(job_dir, status)
+    return status
+
+
+def run_bulk_job(job_dir):
+    """
+    Worker-process entry point: score the stored upload and write results.jsonl.
+    Progress is published through status.json as the file is processed.
+    """
+    from app.database import SessionLocal
+    from app.prediction_logger import BulkPredictionLogger
+
+    status = _update_status(job_dir, state="running", started_at=_now())
+    dedupe_log = status.get("dedupe_log", False)
+    db = SessionLocal()
+    logger = BulkPredictionLogger(db)
+    counts = {"rows_done": 0, "total_fake": 0, "total_real": 0, "total_skipped": 0}
+    offsets = []
+    last_report = time.monotonic()
+
+    try:
+        model, vectorizer = bulk.get_model()
+        scorer = bulk.BulkScorer(model, vectorizer)
+        fmt = status.get("input_format", ".csv")
+        with open(os.path.join(job_dir, "input" + fmt), "rb") as raw, \
+                open(os.path.join(job_dir, "results.jsonl"), "wb") as out:
+            rows = bulk.UploadRows(raw, fmt)
+            for chunk in bulk._iter_chunks(rows):
+                for scored in scorer.score(chunk):
+                    if counts["rows_done"] % PAGE_STRIDE == 0:
+                        offsets.append(out.tell())
+                    row = {
+                        "row": scored.row,
+                        "preview": scored.job_text[:100],
+                        "prediction": scored.prediction,
+                        "confidence": round(scored.confidence * 100, 2),
+                    }
+                    if scored.prediction == "Skipped":
+                        row["reason"] = scored.reason
+                        counts["total_skipped"] += 1
+                    else:
+                        counts["total_fake" if scored.prediction == "Fake" else "total_real"] += 1
+                        bulk._log_scored_row(logger, scored, status.get("user_id"), dedupe_log)
+                    out.write(json.dumps(row).encode("utf-8") + b"\n")
+                    counts["rows_done"] += 1
+
+                if time.monotonic() - last_report >= PROGRESS_INTERVAL:
+                    out.flush()
+                    _update_status(job_dir, **counts, fraud_rate=_fraud_rate(counts))
+                    last_report = time.monotonic()
+            rows.close()
+        logger.flush()
+
+        _update_status(
+            job_dir, **counts,
+            state="completed",
+            fraud_rate=_fraud_rate(counts),
+            page_offsets=offsets,
+            deduplication=scorer.stats(),
+            db_logging=logger.stats(),
+            finished_at=_now(),
+        )
+    except Exception as e:
+        detail = getattr(e, "detail", None) or str(e)
+        _update_status(job_dir, **counts, state="failed", error=detail, finished_at=_now())
+    finally:
+        db.close()
+
+
+def _fraud_rate(counts):
+    total = counts["total_fake"] + counts["total_real"]
+    return round((counts["total_fake"] / total) * 100, 1) if total > 0 else 0
+
+
+def mark_interrupted_jobs():
+    """
+    Fail jobs left queued or running by a previous server process. Their rows
+    may already be logged, so they are not silently re-run. Expired jobs are
+    pruned first.
+    """
+    prune_expired_jobs()
+    if not os.path.isdir(JOBS_DIR):
+        return
+    for job_id in os.listdir(JOBS_DIR):
+        job_dir = _job_dir(job_id)
+        try:
+            status = _read_status(job_dir)
+        except (OSError, ValueError):
+            continue
+        if status.get("state") in ("queued", "running"):
+            _update_status(job_dir, state="failed", error="Interrupted by server restart", finished_at=_now())
+
+
+def prune_expired_jobs():
+    """
+    Delete job directories whose job finished more than RETENTION_SECONDS
+    ago, and leftovers without a readable status.json that are as old.
+    """
+    if not os.path.isdir(JOBS_DIR):
+        return 0
+    cutoff = time.time() - RETENTION_SECONDS
+    removed = 0
+    for job_id in os.listdir(JOBS_DIR):
+        job_dir = _job_dir(job_id)
+        try:
+            if os.path.getmtime(job_dir) >= cutoff:
+                continue  # Written to recently (status.json is replaced in place)
+            status = _read_status(job_dir)
+        except (OSError, ValueError):
+            status = None
+        if status is None or status.get("state") in ("completed", "failed"):
+            shutil.rmtree(job_dir, ignore_errors=True)
+            removed += 1
+    return removed
+
+
+def _store_upload(upload, input_path, fmt):
+    """Copy the upload into the job directory and check it can be opened."""
+    with open(input_path, "wb") as f:
+        shutil.copyfileobj(upload, f)
+    # Validate headers now rather than failing inside the worker
+    with open(input_path, "rb") as raw:
+        bulk.UploadRows(raw, fmt).close()
+
+
+def _on_job_done(job_dir):
+    def callback(future):
+        # A crashed worker process never gets to write its own failure
+        exc = future.exception() if not future.cancelled() else None
+        if future.cancelled() or exc is not None:
+            _update_status(job_dir, state="failed", error=str(exc or "Cancelled"), finished_at=_now())
+    return callback
+
+
+def _load_job(job_id, current_user):
+    """Return the job's status dict, enforcing ownership."""
+    if not job_id.isalnum():
+        raise HTTPException(status_code=404, detail="Job not found")
+    job_dir = _job_dir(job_id)
+    try:
+        status = _read_status(job_dir)
+    except (OSError, ValueError):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    owner = status.get("user_id")
+    if owner is not None:
+        is_admin = current_user is not None and current_user.role == "admin"
+        if not is_admin and (current_user is None or current_user.id != owner):
+            raise HTTPException(status_code=404, detail="Job not found")
+    return status
+
+
+def _public_status(status):
+    return {k: v for k, v in status.items() if k not in ("page_offsets", "user_id")}
+
+
+def _require_completed(status):
+    if status["state"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {status['state']}; results are not ready")
+
+
+@router.post("/bulk-jobs", status_code=202)
+async def create_bulk_job(
+    file: UploadFile = File(...),
+    dedupe_log: bool = False,
+    current_user=Depends(get_current_user),
+):
+    """Upload a file for background analysis. Returns a job ID to poll."""
+    fmt = bulk._detect_format(file.filename)
+    bulk.get_model()  # Fail fast with 503 if no model is trained
+
+    await run_in_threadpool(prune_expired_jobs)
+    job_id = uuid.uuid4().hex
+    job_dir = _job_dir(job_id)
+    os.makedirs(job_dir)
+
+    input_path = os.path.join(job_dir, "input" + fmt)
+    status = {
+        "job_id": job_id,
+        "state": "queued",
+        "filename": file.filename,
+        "input_format": fmt,
+        "user_id": current_user.id if current_user else None,
+        "dedupe_log": dedupe_log,
+        "rows_done": 0,
+        "total_fake": 0,
+        "total_real": 0,
+        "total_skipped": 0,
+        "fraud_rate": 0,
+        "created_at": _now(),
+    }
+    try:
+        await run_in_threadpool(_store_upload, file.file, input_path, fmt)
+        _write_status(job_dir, status)
+        future = _submit(job_dir)
+    except Exception:
+        # Nothing was queued, so don't leave a half-written job behind
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise
+
+    future.add_done_callback(_on_job_done(job_dir))
+
+    return _public_status(status)
+
+
+@router.get("/bulk-jobs/{job_id}")
+async def get_bulk_job(job_id: str, current_user=Depends(get_current_user)):
+    """Current state and progress of a bulk job."""
+    return _public_status(_load_job(job_id, current_user))
+
+
+@router.get("/bulk-jobs/{job_id}/events")
+async def bulk_job_events(job_id: str, current_user=Depends(get_current_user)):
+    """Server-Sent Events stream of progress updates until the job finishes."""
+    _load_job(job_id, current_user)
+    job_dir = _job_dir(job_id)
+
+    async def event_stream():
+        last = None
+        while True:
+            try:
+                status = _public_status(_read_status(job_dir))
+            except (OSError, ValueError):
+                status = last
+            if status is not None and status != last:
+                yield f"data: {json.dumps(status)}\n\n"
+                last = status
+            if status is not None and status["state"] in ("completed", "failed"):
+                break
+            await asyncio.sleep(PROGRESS_INTERVAL)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@router.get("/bulk-jobs/{job_id}/results")
+async def get_bulk_job_results(
+    job_id: str,
+    offset: int = 0,
+    limit: int = 100,
+    current_user=Depends(get_current_user),
+):
+    """Paged JSON results of a completed job."""
+    status = _load_job(job_id, current_user)
+    _require_completed(status)
+
+    offset = max(offset, 0)
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    total = status["rows_done"]
+
+    results = []
+    if offset < total:
+        page_offsets = status.get("page_offsets") or [0]
+        stride_index = min(offset // PAGE_STRIDE, len(page_offsets) - 1)
+        skip = offset - stride_index * PAGE_STRIDE
+        with open(os.path.join(_job_dir(job_id), "results.jsonl"), "rb") as f:
+            f.seek(page_offsets[stride_index])
+            for line in f:
+                if skip:
+                    skip -= 1
+                    continue
+                results.append(json.loads(line))
+                if len(results) >= limit:
+                    break
+
+    return {
+        "job_id": job_id,
+        "offset": offset,
+        "limit": limit,
+        "total": total,
+        "results": results,
+    }
+
+
+@router.get("/bulk-jobs/{job_id}/results.csv")
+async def download_bulk_job_results(job_id: str, current_user=Depends(get_current_user)):
+    """Stream the full results of a completed job as CSV."""
+    status = _load_job(job_id, current_user)
+    _require_completed(status)
+    path = os.path.join(_job_dir(job_id), "results.jsonl")
+
+    def iter_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["Row", "Text Preview", "Prediction", "Confidence (%)"])
+        with open(path, "rb") as f:
+            for i, line in enumerate(f):
+                row = json.loads(line)
+                writer.writerow([row["row"], row["preview"], row["prediction"], row["confidence"]])
+                if i % bulk.CHUNK_SIZE == 0:
+                    yield buffer.getvalue().encode("utf-8")
+                    buffer.seek(0)
+                    buffer.truncate(0)
+        yield buffer.getvalue().encode("utf-8")
+
+    return StreamingResponse(
+        iter_csv(),
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename=bulk_results_{job_id}.csv"},
+    )
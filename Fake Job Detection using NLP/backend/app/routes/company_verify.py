@@ -1,35 +1,54 @@
 """
 Company verification endpoint — checks company names against a known database.
+
+Names are looked up through a bigram candidate index (app/company_index.py)
+and repeated lookups are served from an LRU cache. Known companies mentioned
+in posting text are found with a word-level automaton (app/company_mentions.py).
+Both come from the hot-reloadable registry in app/company_registry.py.
 """
 import os
-import json
-from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import List
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from app.company_registry import get_registry
 
 router = APIRouter()
 
-# Load known companies on startup
-_companies = None
-DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data")
+MAX_EXTRACT_TEXTS = 1000
+MATCH_CACHE_SIZE = int(os.getenv("COMPANY_MATCH_CACHE", "4096"))
+
+
+def find_company_mentions(text):
+    """Known companies named in `text`, in order of appearance."""
+    registry = get_registry()
+    return [
+        {"company": registry.company(company_id), "matched_text": text[start:end], "start": start, "end": end}
+        for company_id, start, end in registry.matcher.find(text)
+    ]
+
 
+_match_cache = {"version": None, "match": None}
 
-def _load_companies():
-    global _companies
-    if _companies is None:
-        path = os.path.join(DATA_DIR, "known_companies.json")
-        if os.path.exists(path):
-            with open(path, "r", encoding="utf-8") as f:
-                _companies = json.load(f)
-        else:
-            _companies = []
-    return _companies
+
+def _cached_match(registry):
+    """LRU-cached `registry.index.match`; the cache is replaced when the registry is."""
+    if _match_cache["version"] != registry.version:
+        # Company IDs change between builds, so cached results never carry over
+        _match_cache["match"] = lru_cache(maxsize=MATCH_CACHE_SIZE)(registry.index.match)
+        _match_cache["version"] = registry.version
+    return _match_cache["match"]
 
 
 class CompanyVerifyRequest(BaseModel):
     company_name: str
 
 
+class CompanyExtractRequest(BaseModel):
+    texts: List[str] = Field(..., min_length=1, max_length=MAX_EXTRACT_TEXTS)
+
+
 @router.post("/verify-company")
 async def verify_company(request: CompanyVerifyRequest):
     """Check if a company name matches known legitimate companies."""
@@ -37,29 +56,17 @@ async def verify_company(request: CompanyVerifyRequest):
     if not name:
         raise HTTPException(status_code=400, detail="Company name is required")
 
-    companies = _load_companies()
-    name_lower = name.lower()
-
-    best_match = None
-    best_score = 0
+    registry = get_registry()
+    best_id, best_score = _cached_match(registry)(name.lower())
+    best_match = registry.company(best_id) if best_id is not None else None
 
-    for company in companies:
-        company_lower = company["name"].lower()
-
-        # Exact match
-        if name_lower == company_lower:
-            return {
-                "verified": True,
-                "match_type": "exact",
-                "confidence": 100,
-                "matched_company": company,
-            }
-
-        # Partial/fuzzy match
-        score = SequenceMatcher(None, name_lower, company_lower).ratio()
-        if score > best_score:
-            best_score = score
-            best_match = company
+    if best_score == 1.0:
+        return {
+            "verified": True,
+            "match_type": "exact",
+            "confidence": 100,
+            "matched_company": best_match,
+        }
 
     if best_score >= 0.8:
         return {
@@ -84,3 +91,13 @@ async def verify_company(request: CompanyVerifyRequest):
             "matched_company": None,
             "warning": "Company not found in our database. This doesn't necessarily mean it's fake — verify through official channels.",
         }
+
+
+@router.post("/extract-companies")
+async def extract_companies(request: CompanyExtractRequest):
+    """Find known company mentions in a batch of posting texts."""
+    results = []
+    for i, text in enumerate(request.texts):
+        mentions = find_company_mentions(text[:50000])
+        results.append({"index": i, "mentions": mentions, "count": len(mentions)})
+    return {"results": results, "total_texts": len(results)}
@@ -4,9 +4,10 @@ User feedback endpoint — allows users to agree/disagree with predictions.
 from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, case
 from pydantic import BaseModel
 
+from app import rollups, write_behind
 from app.database import get_db
 from app.auth import get_current_user, require_auth
 from app.models import Prediction, UserFeedback
@@ -30,15 +31,17 @@ async def submit_feedback(
     if request.feedback not in ("agree", "disagree"):
         raise HTTPException(status_code=400, detail="Feedback must be 'agree' or 'disagree'")
 
+    await write_behind.require_written(request.prediction_id)  # It may still be queued
     prediction = db.query(Prediction).filter(Prediction.id == request.prediction_id).first()
     if not prediction:
-        raise HTTPException(status_code=404, detail="Prediction not found")
+        raise write_behind.prediction_not_found(db, request.prediction_id)
 
     # Check if user already gave feedback on this prediction
     existing = db.query(UserFeedback).filter(
         UserFeedback.prediction_id == request.prediction_id,
         UserFeedback.user_id == current_user.id,
     ).first()
+    previous = existing.feedback if existing else None
     if existing:
         # Update existing feedback
         existing.feedback = request.feedback
@@ -54,6 +57,7 @@ async def submit_feedback(
         )
         db.add(fb)
 
+    rollups.record_feedback(db, current_user.id, previous, request.feedback)
     db.commit()
     return {"message": "Feedback recorded", "feedback": request.feedback}
 
@@ -61,24 +65,38 @@ async def submit_feedback(
 @router.get("/feedback/stats")
 async def feedback_stats(db: Session = Depends(get_db)):
     """Get overall feedback stats for admin dashboard."""
-    total = db.query(UserFeedback).count()
-    agrees = db.query(UserFeedback).filter(UserFeedback.feedback == "agree").count()
-    disagrees = db.query(UserFeedback).filter(UserFeedback.feedback == "disagree").count()
+    counts = db.query(
+        func.count(UserFeedback.id).label("total"),
+        func.sum(case((UserFeedback.feedback == "agree", 1), else_=0)).label("agrees"),
+        func.sum(case((UserFeedback.feedback == "disagree", 1), else_=0)).label("disagrees"),
+    ).one()
+    total = counts.total
+    agrees = int(counts.agrees or 0)
+    disagrees = int(counts.disagrees or 0)
 
     accuracy = round((agrees / total) * 100, 1) if total > 0 else 0
 
     # Recent feedback entries
-    recent = db.query(UserFeedback).order_by(
-        UserFeedback.created_at.desc()
-    ).limit(20).all()
+    recent = (
+        db.query(
+            UserFeedback.id,
+            UserFeedback.prediction_id,
+            UserFeedback.feedback,
+            UserFeedback.correct_label,
+            UserFeedback.created_at,
+            Prediction.prediction.label("prediction_result"),
+        )
+        .outerjoin(Prediction, Prediction.id == UserFeedback.prediction_id)
+        .order_by(UserFeedback.created_at.desc())
+        .limit(20).all()
+    )
 
     recent_list = []
     for fb in recent:
-        pred = db.query(Prediction).filter(Prediction.id == fb.prediction_id).first()
         recent_list.append({
             "id": fb.id,
             "prediction_id": fb.prediction_id,
-            "prediction_result": pred.prediction if pred else "—",
+            "prediction_result": fb.prediction_result or "—",
             "feedback": fb.feedback,
             "correct_label": fb.correct_label,
             "created_at": fb.created_at.isoformat() if fb.created_at else "",
@@ -5,10 +5,12 @@ from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
+from app import stats_cache, write_behind
 from app.database import get_db
 from app.models import Prediction, FlaggedPost
 from app.schemas import FlagRequest, FlagResponse
 from app.auth import get_current_user
+from app.queries import job_text_preview, preview_text
 
 router = APIRouter()
 
@@ -20,9 +22,10 @@ async def flag_post(
     current_user=Depends(get_current_user)
 ):
     """Flag a prediction as suspicious."""
+    await write_behind.require_written(request.prediction_id)  # It may still be queued
     prediction = db.query(Prediction).filter(Prediction.id == request.prediction_id).first()
     if not prediction:
-        raise HTTPException(status_code=404, detail="Prediction not found")
+        raise write_behind.prediction_not_found(db, request.prediction_id)
     
     existing = db.query(FlaggedPost).filter(FlaggedPost.prediction_id == request.prediction_id).first()
     if existing:
@@ -38,6 +41,7 @@ async def flag_post(
     )
     db.add(flagged)
     db.commit()
+    stats_cache.invalidate()
     db.refresh(flagged)
     
     return flagged
@@ -50,19 +54,30 @@ async def get_flagged_posts(
     db: Session = Depends(get_db)
 ):
     """Get all flagged posts."""
-    flagged = db.query(FlaggedPost).order_by(
-        FlaggedPost.flagged_at.desc()
-    ).offset(skip).limit(limit).all()
+    flagged = (
+        db.query(
+            FlaggedPost.id,
+            FlaggedPost.prediction_id,
+            FlaggedPost.reason,
+            FlaggedPost.flagged_by,
+            FlaggedPost.flagged_at,
+            *job_text_preview(),
+            Prediction.prediction,
+            Prediction.confidence,
+        )
+        .outerjoin(Prediction, Prediction.id == FlaggedPost.prediction_id)
+        .order_by(FlaggedPost.flagged_at.desc())
+        .offset(skip).limit(limit).all()
+    )
     
     result = []
     for f in flagged:
-        prediction = db.query(Prediction).filter(Prediction.id == f.prediction_id).first()
         result.append({
             "id": f.id,
             "prediction_id": f.prediction_id,
-            "job_text": prediction.job_text[:200] + "..." if prediction and len(prediction.job_text) > 200 else (prediction.job_text if prediction else ""),
-            "prediction": prediction.prediction if prediction else "",
-            "confidence": prediction.confidence if prediction else 0,
+            "job_text": preview_text(f),
+            "prediction": f.prediction or "",
+            "confidence": f.confidence if f.confidence is not None else 0,
             "reason": f.reason,
             "flagged_by": f.flagged_by,
             "flagged_at": f.flagged_at.isoformat()
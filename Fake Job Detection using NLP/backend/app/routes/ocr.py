@@ -1,66 +1,251 @@
 """
 OCR endpoint — extract text from uploaded images of job postings.
 Uses Pillow for image processing with a simple fallback when Tesseract is unavailable.
+
+OCR runs in a bounded worker pool off the event loop. When every worker is
+busy and the queue is full, requests are turned away with 503 instead of
+piling up; each job has a timeout and is cancelled if it never started.
 """
 import io
+import os
+import time
+import asyncio
+import threading
+from typing import List
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
 
+from app import ocr_cache
 from app.database import get_db
 from app.auth import get_current_user
 
 router = APIRouter()
 
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2"))
+OCR_QUEUE_LIMIT = int(os.getenv("OCR_QUEUE_LIMIT", "8"))  # Jobs allowed to wait for a worker
+OCR_TIMEOUT = float(os.getenv("OCR_TIMEOUT", "30"))  # Seconds per job, queueing included
+OCR_PREPROCESS = os.getenv("OCR_PREPROCESS", "1") != "0"
+OCR_TARGET_DPI = 300
+OCR_MAX_SIDE = 2500  # Pixels; roughly a letter-size page at OCR_TARGET_DPI
+OCR_MARGIN = 10  # Pixels of white kept around the cropped text
+OCR_MAX_PAGES = int(os.getenv("OCR_MAX_PAGES", "20"))  # Pages per multi-page request
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+ALLOWED_IMAGE_TYPES = {"image/png", "image/jpeg", "image/jpg", "image/webp", "image/bmp", "image/tiff"}
+
+_executor = None
+_pending = 0  # Jobs queued or running
+_pending_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=OCR_WORKERS, thread_name_prefix="ocr")
+    return _executor
+
+
+def shutdown_pool():
+    """Stop the OCR pool (called on application shutdown)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
 
-def _extract_text_from_image(image_bytes: bytes) -> str:
+
+def _release_slot(_future):
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+
+async def _run_in_ocr_pool(func, *args):
     """
-    Try OCR via pytesseract -> Pillow.
-    Falls back to a basic image-info stub if tesseract binary isn't found.
+    Run `func(*args)` on the OCR pool. Raises 503 when the pool and its queue
+    are full and 504 when the job exceeds OCR_TIMEOUT.
     """
+    global _pending
+    with _pending_lock:
+        if _pending >= OCR_WORKERS + OCR_QUEUE_LIMIT:
+            raise HTTPException(
+                status_code=503,
+                detail="OCR service is busy. Please retry shortly.",
+                headers={"Retry-After": "5"},
+            )
+        _pending += 1
+
+    future = _get_executor().submit(func, *args)
+    # The slot is freed when the job really finishes (or is cancelled before starting)
+    future.add_done_callback(_release_slot)
     try:
-        from PIL import Image
-        img = Image.open(io.BytesIO(image_bytes))
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=OCR_TIMEOUT)
+    except asyncio.TimeoutError:
+        future.cancel()
+        raise HTTPException(status_code=504, detail="OCR timed out. Try a smaller or clearer image.")
+    except asyncio.CancelledError:
+        # Client went away: drop the job if it has not started yet
+        future.cancel()
+        raise
+
+
+def _otsu_threshold(histogram):
+    """Grey level that best separates a 256-bin histogram into two classes."""
+    total = sum(histogram)
+    weighted_total = sum(i * count for i, count in enumerate(histogram))
+    background = weighted_background = 0
+    best_level, best_variance = 127, -1.0
+    for level, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        weighted_background += level * count
+        mean_bg = weighted_background / background
+        mean_fg = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_bg - mean_fg) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    return best_level
+
+
+def _prepare_image(img):
+    """
+    Normalise an image for Tesseract: apply EXIF orientation, scale down to
+    about OCR_TARGET_DPI, convert to grayscale, binarise (Otsu) with dark text
+    on white, and crop empty margins.
+    """
+    from PIL import ImageOps
+
+    img = ImageOps.exif_transpose(img)
+    gray = img.convert("L")  # Before resizing: one channel is cheaper to resample
+
+    dpi = img.info.get("dpi", (0, 0))[0] or 0
+    scale = 1.0
+    if dpi > OCR_TARGET_DPI:
+        scale = OCR_TARGET_DPI / float(dpi)
+    longest = max(gray.size) * scale
+    if longest > OCR_MAX_SIDE:
+        scale *= OCR_MAX_SIDE / longest
+    if scale < 1.0:
+        gray = gray.resize((max(1, int(gray.width * scale)), max(1, int(gray.height * scale))))
+
+    threshold = _otsu_threshold(gray.histogram())
+    binary = gray.point(lambda v: 255 if v > threshold else 0)
+    # Screenshots of dark themes: keep text dark on a light background
+    if binary.histogram()[0] > binary.width * binary.height / 2:
+        binary = ImageOps.invert(binary)
 
-        # Attempt pytesseract
-        try:
-            import pytesseract
-            text = pytesseract.image_to_string(img)
-            return text.strip()
-        except Exception:
-            # Tesseract not installed — return image metadata as fallback
-            w, h = img.size
-            return f"[Image {w}x{h} — Tesseract OCR not available. Install Tesseract to enable text extraction from images.]"
+    bbox = ImageOps.invert(binary).getbbox()
+    if bbox:
+        left, top, right, bottom = bbox
+        binary = binary.crop((
+            max(0, left - OCR_MARGIN), max(0, top - OCR_MARGIN),
+            min(binary.width, right + OCR_MARGIN), min(binary.height, bottom + OCR_MARGIN),
+        ))
+    return binary
+
+
+def _decode_image(image_bytes: bytes, frame: int = 0):
+    from PIL import Image
+    try:
+        img = Image.open(io.BytesIO(image_bytes))
+        if frame:
+            img.seek(frame)
+        img.load()
+        return img
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Could not process image: {str(e)}")
 
 
-@router.post("/predict-image")
-async def predict_from_image(
-    file: UploadFile = File(...),
-    db=Depends(get_db),
-    current_user=Depends(get_current_user),
-):
-    """Extract text from an uploaded image and run prediction."""
-    # Validate file type
-    allowed = {"image/png", "image/jpeg", "image/jpg", "image/webp", "image/bmp", "image/tiff"}
-    if file.content_type not in allowed:
-        raise HTTPException(status_code=400, detail=f"Unsupported image type: {file.content_type}. Use PNG, JPEG, WebP, BMP, or TIFF.")
+def _run_tesseract(img, preprocess: bool) -> str:
+    """OCR a decoded image. Raises if Tesseract is missing or fails."""
+    import pytesseract
+    ocr_input = _prepare_image(img) if preprocess else img
+    config = f"--dpi {OCR_TARGET_DPI}" if preprocess else ""
+    # Tesseract is killed if it outlives the job deadline
+    return pytesseract.image_to_string(ocr_input, config=config, timeout=OCR_TIMEOUT).strip()
+
+
+def _tesseract_missing_text(img) -> str:
+    w, h = img.size
+    return f"[Image {w}x{h} — Tesseract OCR not available. Install Tesseract to enable text extraction from images.]"
+
+
+def _extract_text_from_image(image_bytes: bytes, preprocess: bool = None) -> str:
+    """
+    Try OCR via pytesseract -> Pillow.
+    Falls back to a basic image-info stub if tesseract binary isn't found.
+    """
+    if preprocess is None:
+        preprocess = OCR_PREPROCESS
+    img = _decode_image(image_bytes)
+    try:
+        return _run_tesseract(img, preprocess)
+    except Exception:
+        # Tesseract not installed — return image metadata as fallback
+        return _tesseract_missing_text(img)
+
 
+def _extract_text_cached(image_bytes: bytes, digest: str, frame: int = 0):
+    """
+    Worker-side OCR through the cache: try a perceptual match first, then
+    OCR and remember the result. Returns (text, cache_status).
+    """
+    img = _decode_image(image_bytes, frame)
+    dhash = ocr_cache.perceptual_hash(img) if ocr_cache.USE_PHASH else None
+    text = ocr_cache.get_similar(dhash)
+    if text is not None:
+        ocr_cache.put(digest, dhash, text)
+        return text, "perceptual"
+
+    ocr_cache.record_miss()
+    try:
+        text = _run_tesseract(img, OCR_PREPROCESS)
+    except Exception:
+        # Fallback text is not cached, so installing Tesseract takes effect at once
+        return _tesseract_missing_text(img), "miss"
+    ocr_cache.put(digest, dhash, text)
+    return text, "miss"
+
+
+def _ocr_page_timed(image_bytes: bytes, digest: str, frame: int):
+    """_extract_text_cached plus the worker's start and end times."""
+    started = time.perf_counter()
+    text, cache_status = _extract_text_cached(image_bytes, digest, frame)
+    return text, cache_status, started, time.perf_counter()
+
+
+async def _read_image_upload(file: UploadFile) -> bytes:
+    if file.content_type not in ALLOWED_IMAGE_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported image type: {file.content_type}. Use PNG, JPEG, WebP, BMP, or TIFF.")
     image_bytes = await file.read()
-    if len(image_bytes) > 10 * 1024 * 1024:
+    if len(image_bytes) > MAX_IMAGE_BYTES:
         raise HTTPException(status_code=400, detail="Image too large. Max 10 MB.")
+    return image_bytes
+
+
+def _count_frames(image_bytes: bytes, filename: str) -> int:
+    from PIL import Image
+    try:
+        return getattr(Image.open(io.BytesIO(image_bytes)), "n_frames", 1)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not process image {filename}: {str(e)}")
+
 
-    extracted_text = _extract_text_from_image(image_bytes)
+def _require_text(extracted_text: str):
     if not extracted_text or len(extracted_text.strip()) < 20:
         raise HTTPException(
             status_code=422,
             detail="Could not extract enough text from the image. Please try a clearer screenshot or paste the text manually."
         )
 
-    # Run through the prediction pipeline
+
+def _predict_and_log(extracted_text: str, db, current_user):
+    """Run the prediction pipeline on OCR text and save the prediction."""
     from app.routes.predict import get_model, _extract_risk_factors
     from ml.preprocess import preprocess_text
-    from app.models import Prediction
-    from sqlalchemy.orm import Session
+    from app.write_behind import log_prediction
 
     model, vectorizer = get_model()
     clean_text = preprocess_text(extracted_text)
@@ -78,15 +263,7 @@ async def predict_from_image(
 
     # Save prediction
     user_id = current_user.id if current_user else None
-    record = Prediction(
-        user_id=user_id,
-        job_text=extracted_text[:2000],
-        prediction=result,
-        confidence=confidence,
-    )
-    db.add(record)
-    db.commit()
-    db.refresh(record)
+    record = log_prediction(db, extracted_text, result, confidence, user_id=user_id, max_length=2000)
 
     return {
         "prediction": result,
@@ -97,3 +274,97 @@ async def predict_from_image(
         "extracted_text_length": len(extracted_text),
         "risk_factors": risk_factors,
     }
+
+
+@router.post("/predict-image")
+async def predict_from_image(
+    file: UploadFile = File(...),
+    db=Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Extract text from an uploaded image and run prediction."""
+    image_bytes = await _read_image_upload(file)
+
+    digest = ocr_cache.content_hash(image_bytes)
+    extracted_text = ocr_cache.get(digest)
+    if extracted_text is not None:
+        ocr_cache_status = "exact"
+    else:
+        extracted_text, ocr_cache_status = await _run_in_ocr_pool(_extract_text_cached, image_bytes, digest)
+    _require_text(extracted_text)
+
+    response = _predict_and_log(extracted_text, db, current_user)
+    response["ocr_cache"] = ocr_cache_status
+    return response
+
+
+@router.post("/predict-image/pages")
+async def predict_from_pages(
+    files: List[UploadFile] = File(...),
+    db=Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    OCR several screenshots and/or a multi-page TIFF of one posting in
+    parallel, join the text in page order and run a single prediction.
+    """
+    pages = []  # (filename, frame, image_bytes, cache key)
+    for file in files:
+        image_bytes = await _read_image_upload(file)
+        digest = ocr_cache.content_hash(image_bytes)
+        frames = _count_frames(image_bytes, file.filename)
+        for frame in range(frames):
+            key = digest if frames == 1 else f"{digest}:{frame}"
+            pages.append((file.filename, frame, image_bytes, key))
+    if len(pages) > OCR_MAX_PAGES:
+        raise HTTPException(status_code=400, detail=f"Too many pages. Max {OCR_MAX_PAGES} per request.")
+
+    # At most one page per worker in flight, so one document cannot fill the queue
+    in_flight = asyncio.Semaphore(OCR_WORKERS)
+
+    async def ocr_page(number, filename, frame, image_bytes, key):
+        page = {"page": number, "filename": filename, "frame": frame}
+        submitted = time.perf_counter()
+        text = ocr_cache.get(key)
+        if text is not None:
+            page.update(ocr_cache="exact", queue_ms=0.0, ocr_ms=0.0)
+        else:
+            async with in_flight:
+                text, status, started, finished = await _run_in_ocr_pool(_ocr_page_timed, image_bytes, key, frame)
+            page.update(
+                ocr_cache=status,
+                queue_ms=round((started - submitted) * 1000, 1),
+                ocr_ms=round((finished - started) * 1000, 1),
+            )
+        page["total_ms"] = round((time.perf_counter() - submitted) * 1000, 1)
+        page["text_length"] = len(text)
+        return text, page
+
+    started = time.perf_counter()
+    tasks = [asyncio.create_task(ocr_page(i + 1, *p)) for i, p in enumerate(pages)]
+    try:
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        # One page failed (busy, timeout, bad frame): drop the rest
+        for task in tasks:
+            task.cancel()
+        raise
+    ocr_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    extracted_text = "\n\n".join(text.strip() for text, _ in results if text.strip())
+    _require_text(extracted_text)
+
+    response = _predict_and_log(extracted_text, db, current_user)
+    response["pages"] = [page for _, page in results]
+    response["page_count"] = len(results)
+    response["ocr_ms"] = ocr_ms
+    return response
+
+
+@router.get("/predict-image/stats")
+async def ocr_stats():
+    """OCR cache and worker pool counters for this worker."""
+    return {
+        "cache": ocr_cache.stats(),
+        "pool": {"workers": OCR_WORKERS, "queue_limit": OCR_QUEUE_LIMIT, "pending": _pending},
+    }
@@ -3,12 +3,13 @@ Prediction endpoint for job analysis.
 """
 import os
 import joblib
-from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
+from app import stats_cache
 from app.database import get_db
-from app.models import Prediction
+from app import write_behind
+from app.write_behind import log_prediction
 from app.schemas import PredictRequest, PredictResponse
 from app.auth import get_current_user
 
@@ -47,6 +48,7 @@ def reload_model():
     global _model, _vectorizer
     _model = None
     _vectorizer = None
+    stats_cache.invalidate()  # Model info in /stats comes from the new metadata
     return get_model()
 
 
@@ -121,17 +123,14 @@ async def predict_job(
     
     # Log to database
     user_id = current_user.id if current_user else None
-    prediction_record = Prediction(
-        user_id=user_id,
-        job_text=original_text[:5000],
+    prediction_record = log_prediction(
+        db,
+        job_text=original_text,
         prediction=result,
         confidence=round(confidence, 4),
+        user_id=user_id,
         model_used=model_used,
-        created_at=datetime.now(timezone.utc)
     )
-    db.add(prediction_record)
-    db.commit()
-    db.refresh(prediction_record)
     
     # Risk breakdown
     risk_factors = _extract_risk_factors(model, vectorizer, features, clean_text)
@@ -156,9 +155,20 @@ async def predict_job(
     if model_b_result:
         response["model_b_result"] = model_b_result
 
+    # Known companies named in the posting
+    if request.detect_companies:
+        from app.routes.company_verify import find_company_mentions
+        response["company_mentions"] = find_company_mentions(original_text)
+
     return response
 
 
+@router.get("/predict/write-behind/stats")
+async def write_behind_stats():
+    """Queue depth, unwritten-row age and flush counters for prediction logging."""
+    return write_behind.stats()
+
+
 def _extract_risk_factors(model, vectorizer, features, clean_text):
     """Extract top risk-contributing features from the prediction."""
     try:
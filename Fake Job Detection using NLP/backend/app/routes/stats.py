@@ -1,17 +1,24 @@
 """
 Stats endpoint for analytics data.
+
+/stats is served from app/stats_cache.py with an ETag, so dashboards that
+poll it mostly get a cached body or a 304.
 """
 from datetime import datetime, timedelta, timezone
 from collections import defaultdict
-from fastapi import APIRouter, Depends
+from typing import Optional
+from fastapi import APIRouter, Depends, Request, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, case, select
 import json
 import os
 
+from app import stats_cache
 from app.database import get_db
-from app.models import Prediction, FlaggedPost, ModelVersion
+from app.models import Prediction, FlaggedPost, ModelVersion, DailyRollup
 from app.auth import require_auth
+from app.queries import job_text_preview, preview_text, newest_first_page
 
 router = APIRouter()
 
@@ -19,31 +26,54 @@ MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path
 
 
 @router.get("/stats")
-async def get_stats(db: Session = Depends(get_db)):
+async def get_stats(request: Request, db: Session = Depends(get_db)):
     """Return analytics data for the dashboard."""
-    
-    total_predictions = db.query(Prediction).count()
-    total_fake = db.query(Prediction).filter(Prediction.prediction == "Fake").count()
-    total_real = db.query(Prediction).filter(Prediction.prediction == "Real").count()
-    total_flagged = db.query(FlaggedPost).count()
+    cached = stats_cache.get()
+    if cached is None:
+        # Read the generation first, so an invalidation during the compute keeps this body out of the cache
+        generation = stats_cache.current_generation()
+        cached = stats_cache.put(_compute_stats(db), generation)
+    body, etag = cached
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(body, headers=headers)
+
+
+def _compute_stats(db):
+    counts = db.execute(
+        select(
+            func.sum(case((DailyRollup.label == "Fake", DailyRollup.count), else_=0)).label("fake"),
+            func.sum(case((DailyRollup.label == "Real", DailyRollup.count), else_=0)).label("real"),
+            select(func.count(FlaggedPost.id)).scalar_subquery().label("flagged"),
+        )
+    ).one()
+    total_fake = int(counts.fake or 0)
+    total_real = int(counts.real or 0)
+    total_predictions = total_fake + total_real
+    total_flagged = int(counts.flagged or 0)
     
     fake_percentage = round((total_fake / total_predictions * 100), 2) if total_predictions > 0 else 0
     
     # Daily stats for the last 30 days
-    thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
-    recent_predictions = db.query(Prediction).filter(
-        Prediction.created_at >= thirty_days_ago
-    ).all()
+    thirty_days_ago = (datetime.now(timezone.utc) - timedelta(days=30)).date()
+    daily_rows = (
+        db.query(DailyRollup.day, DailyRollup.label, func.sum(DailyRollup.count).label("count"))
+        .filter(DailyRollup.day >= thirty_days_ago)
+        .group_by(DailyRollup.day, DailyRollup.label)
+        .all()
+    )
     
     daily_map = defaultdict(lambda: {"date": "", "total": 0, "fake": 0, "real": 0})
-    for p in recent_predictions:
-        day = p.created_at.strftime("%Y-%m-%d")
+    for r in daily_rows:
+        day = r.day.strftime("%Y-%m-%d")
         daily_map[day]["date"] = day
-        daily_map[day]["total"] += 1
-        if p.prediction == "Fake":
-            daily_map[day]["fake"] += 1
+        daily_map[day]["total"] += r.count
+        if r.label == "Fake":
+            daily_map[day]["fake"] += r.count
         else:
-            daily_map[day]["real"] += 1
+            daily_map[day]["real"] += r.count
     
     daily_stats = sorted(daily_map.values(), key=lambda x: x["date"])
     
@@ -56,24 +86,24 @@ async def get_stats(db: Session = Depends(get_db)):
 
     # ── Feature 10: A/B Test Stats ──
     try:
-        from sqlalchemy import case
         ab_stats = db.query(
-            Prediction.model_used,
-            func.count(Prediction.id).label('count'),
-            func.avg(Prediction.confidence).label('avg_conf'),
-            func.sum(case((Prediction.prediction == 'Fake', 1), else_=0)).label('fake_count')
-        ).group_by(Prediction.model_used).all()
+            DailyRollup.model_used,
+            func.sum(DailyRollup.count).label('count'),
+            func.sum(DailyRollup.confidence_sum).label('confidence_sum'),
+            func.sum(case((DailyRollup.label == 'Fake', DailyRollup.count), else_=0)).label('fake_count')
+        ).group_by(DailyRollup.model_used).all()
 
         ab_results = []
         for m in ab_stats:
             model_name = m.model_used or 'model_a'
-            total = m.count
+            total = int(m.count or 0)
             fake = int(m.fake_count or 0)
+            avg_conf = (m.confidence_sum or 0) / total if total > 0 else 0
             ab_results.append({
                  "model": model_name,
                  "total_predictions": total,
                  "fake_percentage": round((fake / total * 100), 1) if total > 0 else 0,
-                 "avg_confidence": round(float(m.avg_conf or 0) * 100, 1)
+                 "avg_confidence": round(float(avg_conf) * 100, 1)
             })
         model_info['ab_test_results'] = ab_results
     except Exception as e:
@@ -95,51 +125,73 @@ async def get_stats(db: Session = Depends(get_db)):
 async def get_predictions(
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = None,
+    exact_total: bool = False,
     db: Session = Depends(get_db)
 ):
-    """Return paginated prediction logs."""
-    predictions = db.query(Prediction).order_by(
-        Prediction.created_at.desc()
-    ).offset(skip).limit(limit).all()
+    """
+    Return paginated prediction logs, newest first. Pass the returned
+    `next_cursor` as `cursor` for the next page; `skip` still works but
+    gets slower the deeper it goes. `total` comes from the daily rollups
+    unless `exact_total=true` asks for a full COUNT.
+    """
+    query = (
+        db.query(
+            Prediction.id,
+            *job_text_preview(),
+            Prediction.prediction,
+            Prediction.confidence,
+            Prediction.created_at,
+            FlaggedPost.id.label("flag_id"),
+            FlaggedPost.reason.label("flag_reason"),
+        )
+        .outerjoin(FlaggedPost, FlaggedPost.prediction_id == Prediction.id)
+    )
+    predictions, next_cursor = newest_first_page(query, cursor, limit, skip)
     
     result = []
     for p in predictions:
-        flagged = db.query(FlaggedPost).filter(FlaggedPost.prediction_id == p.id).first()
         result.append({
             "id": p.id,
-            "job_text": p.job_text[:200] + "..." if len(p.job_text) > 200 else p.job_text,
+            "job_text": preview_text(p),
             "prediction": p.prediction,
             "confidence": round(p.confidence * 100, 2) if p.confidence <= 1 else p.confidence,
             "created_at": p.created_at.isoformat(),
-            "is_flagged": flagged is not None,
-            "flag_reason": flagged.reason if flagged else None
+            "is_flagged": p.flag_id is not None,
+            "flag_reason": p.flag_reason if p.flag_id is not None else None
         })
     
-    return {"predictions": result, "total": db.query(Prediction).count()}
+    if exact_total:
+        total = db.query(func.coalesce(func.sum(Prediction.repeat_count), 0)).scalar()
+    else:
+        total = db.query(func.coalesce(func.sum(DailyRollup.count), 0)).scalar()
+    return {"predictions": result, "total": total, "next_cursor": next_cursor}
 
 
 @router.get("/my-predictions")
 async def get_my_predictions(
     skip: int = 0,
     limit: int = 10,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user=Depends(require_auth),
 ):
-    """Return the current user's recent predictions."""
-    predictions = db.query(Prediction).filter(
+    """Return the current user's recent predictions; page with `next_cursor` as for /predictions."""
+    query = db.query(
+        Prediction.id, *job_text_preview(), Prediction.prediction, Prediction.confidence, Prediction.created_at,
+    ).filter(
         Prediction.user_id == current_user.id
-    ).order_by(
-        Prediction.created_at.desc()
-    ).offset(skip).limit(limit).all()
+    )
+    predictions, next_cursor = newest_first_page(query, cursor, limit, skip)
 
     result = []
     for p in predictions:
         result.append({
             "id": p.id,
-            "job_text": p.job_text[:200] + "..." if len(p.job_text) > 200 else p.job_text,
+            "job_text": preview_text(p),
             "prediction": p.prediction,
             "confidence": round(p.confidence * 100, 2) if p.confidence <= 1 else p.confidence,
             "created_at": p.created_at.isoformat(),
         })
 
-    return {"predictions": result}
+    return {"predictions": result, "next_cursor": next_cursor}
@@ -1,31 +1,19 @@
 """
 Trending scam patterns endpoint.
-Analyses recent predictions to surface common fraud patterns.
+Aggregates the scam-pattern tags and daily rollups written when
+predictions are logged.
 """
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from datetime import datetime, timedelta
-import re
-from collections import Counter
 
 from app.database import get_db
-from app.models import Prediction
+from app.models import DailyRollup, PredictionTag
+from app.scam_patterns import SCAM_PATTERNS  # Re-exported: the patterns used to live here
 
 router = APIRouter()
 
-# Known scam keyword groups
-SCAM_PATTERNS = {
-    "Work From Home Scam": ["work from home", "remote work", "work at home", "earn from home", "home based"],
-    "Advance Fee Fraud": ["processing fee", "registration fee", "training fee", "pay to apply", "upfront payment", "send money"],
-    "Data Harvesting": ["ssn", "social security", "bank details", "credit card", "passport number", "personal information"],
-    "Fake Urgency": ["limited spots", "act now", "immediately", "urgent hiring", "don't miss", "apply today only"],
-    "Unrealistic Pay": ["$5000 weekly", "earn $", "guaranteed income", "unlimited earning", "high salary", "easy money"],
-    "Crypto / Investment Scam": ["crypto", "bitcoin", "forex", "investment opportunity", "trading", "nft"],
-    "Impersonation": ["google hiring", "amazon hiring", "microsoft hiring", "fake brand", "on behalf of"],
-    "Contact Red Flags": ["whatsapp", "telegram", "personal email", "gmail.com", "yahoo.com"],
-}
-
 
 @router.get("/trending")
 async def trending_scam_patterns(
@@ -35,17 +23,15 @@ async def trending_scam_patterns(
     """
     Returns trending scam patterns found in recent fake predictions.
     """
-    cutoff = datetime.utcnow() - timedelta(days=min(days, 90))
+    # Whole days, so tag counts line up with the daily rollups
+    cutoff_day = (datetime.utcnow() - timedelta(days=min(days, 90))).date()
+    cutoff = datetime.combine(cutoff_day, datetime.min.time())
 
-    fake_posts = (
-        db.query(Prediction.job_text, Prediction.created_at, Prediction.confidence)
-        .filter(Prediction.prediction == "Fake", Prediction.created_at >= cutoff)
-        .order_by(Prediction.created_at.desc())
-        .limit(500)
-        .all()
+    total_fake = int(
+        db.query(func.sum(DailyRollup.count))
+        .filter(DailyRollup.label == "Fake", DailyRollup.day >= cutoff_day)
+        .scalar() or 0
     )
-
-    total_fake = len(fake_posts)
     if total_fake == 0:
         return {
             "period_days": days,
@@ -54,22 +40,27 @@ async def trending_scam_patterns(
             "top_keywords": [],
         }
 
-    # Count pattern occurrences
-    pattern_counts = Counter()
-    keyword_counts = Counter()
-
-    for post in fake_posts:
-        text_lower = (post.job_text or "").lower()
-        for pattern_name, keywords in SCAM_PATTERNS.items():
-            for kw in keywords:
-                if kw in text_lower:
-                    pattern_counts[pattern_name] += 1
-                    keyword_counts[kw] += 1
-                    break  # count each pattern once per post
+    tag_count = func.sum(PredictionTag.repeat_count).label("count")
+    pattern_counts = (
+        db.query(PredictionTag.pattern, tag_count)
+        .filter(PredictionTag.created_at >= cutoff)
+        .group_by(PredictionTag.pattern)
+        .order_by(tag_count.desc(), PredictionTag.pattern)
+        .limit(10)
+        .all()
+    )
+    keyword_counts = (
+        db.query(PredictionTag.keyword, tag_count)
+        .filter(PredictionTag.created_at >= cutoff)
+        .group_by(PredictionTag.keyword)
+        .order_by(tag_count.desc(), PredictionTag.keyword)
+        .limit(15)
+        .all()
+    )
 
     # Build pattern list sorted by frequency
     patterns = []
-    for name, count in pattern_counts.most_common(10):
+    for name, count in pattern_counts:
         patterns.append({
             "pattern": name,
             "count": count,
@@ -80,19 +71,19 @@ async def trending_scam_patterns(
     # Top individual keywords
     top_keywords = [
         {"keyword": kw, "count": c}
-        for kw, c in keyword_counts.most_common(15)
+        for kw, c in keyword_counts
     ]
 
     # Daily trend (last 7 days)
-    seven_days_ago = datetime.utcnow() - timedelta(days=7)
+    seven_days_ago = (datetime.utcnow() - timedelta(days=7)).date()
     daily_counts = (
         db.query(
-            func.date(Prediction.created_at).label("date"),
-            func.count(Prediction.id).label("count"),
+            DailyRollup.day.label("date"),
+            func.sum(DailyRollup.count).label("count"),
         )
-        .filter(Prediction.prediction == "Fake", Prediction.created_at >= seven_days_ago)
-        .group_by("date")
-        .order_by("date")
+        .filter(DailyRollup.label == "Fake", DailyRollup.day >= seven_days_ago)
+        .group_by(DailyRollup.day)
+        .order_by(DailyRollup.day)
         .all()
     )
     daily_trend = [{"date": str(r.date), "count": r.count} for r in daily_counts]
@@ -1,17 +1,34 @@
 """
 URL scraper endpoint — scrapes job posting from a URL and analyzes it.
+
+Pages are fetched with a shared async HTTP client: one keep-alive
+connection pool for the process, a cap on concurrent connections per host
+and a total deadline per fetch, so a slow job board never blocks the
+event loop. Bodies are streamed up to MAX_PAGE_BYTES, and schema.org
+JobPosting JSON-LD is used when present instead of parsing the whole DOM.
 """
+import os
 import re
-import requests
+import html
+import json
+import time
+import asyncio
+import contextlib
+import urllib.parse
+import httpx
 from bs4 import BeautifulSoup
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
+from app import scrape_cache
 from app.database import get_db
 from app.auth import get_current_user
 from app.routes.predict import get_model, preprocess_text
-from app.models import Prediction
+from app.write_behind import log_prediction
 from datetime import datetime, timezone
+from collections import namedtuple
 
 router = APIRouter()
 
@@ -20,24 +37,185 @@ HEADERS = {
                   "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 }
 
-
-def _scrape_job_text(url: str) -> dict:
-    """Fetch a URL and extract the main text content."""
-    import urllib.parse
+MAX_CONNECTIONS = int(os.getenv("SCRAPER_MAX_CONNECTIONS", "100"))
+MAX_CONNECTIONS_PER_HOST = int(os.getenv("SCRAPER_MAX_CONNECTIONS_PER_HOST", "4"))
+KEEPALIVE_SECONDS = float(os.getenv("SCRAPER_KEEPALIVE_SECONDS", "30"))
+CONNECT_TIMEOUT = float(os.getenv("SCRAPER_CONNECT_TIMEOUT", "5"))
+FETCH_DEADLINE = float(os.getenv("SCRAPER_FETCH_DEADLINE", "15"))  # Whole fetch, redirects included
+BATCH_CONCURRENCY = int(os.getenv("SCRAPER_BATCH_CONCURRENCY", "16"))  # Fetches in flight per batch
+MAX_BATCH_URLS = 100
+MAX_PAGE_BYTES = int(os.getenv("SCRAPER_MAX_PAGE_BYTES", str(2 * 1024 * 1024)))
+MAX_TEXT_CHARS = 10000
+
+FetchedPage = namedtuple("FetchedPage", "status_code headers text bytes_read truncated")
+
+JSON_LD_RE = re.compile(
+    r'<script[^>]+type\s*=\s*["\']application/ld\+json["\'][^>]*>(.*?)</script>',
+    re.IGNORECASE | re.DOTALL,
+)
+
+# Per-worker totals, reported by /predict-url/stats
+scan_metrics = {"pages_fetched": 0, "bytes_read": 0, "truncated": 0,
+                "json-ld": 0, "html": 0, "parse_seconds": 0.0}
+
+_client = None
+_host_slots = {}  # host -> [semaphore, fetches holding or waiting for it]
+
+
+def _get_client():
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            headers=HEADERS,
+            follow_redirects=True,
+            timeout=httpx.Timeout(FETCH_DEADLINE, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_SECONDS,
+            ),
+        )
+    return _client
+
+
+async def close_client():
+    """Close the shared HTTP client (called on application shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _host_slots.clear()
+
+
+@contextlib.asynccontextmanager
+async def _host_slot(host):
+    """
+    Hold one of the host's MAX_CONNECTIONS_PER_HOST fetch slots. A host's
+    semaphore is dropped once no fetch holds or waits on it, so the map
+    only ever covers hosts with fetches in flight.
+    """
+    entry = _host_slots.get(host)
+    if entry is None:
+        entry = _host_slots[host] = [asyncio.Semaphore(MAX_CONNECTIONS_PER_HOST), 0]
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0 and _host_slots.get(host) is entry:
+            del _host_slots[host]
+
+
+def _canonical_url(url: str) -> str:
+    """
+    Rewrite LinkedIn search URLs carrying currentJobId to the job's own page,
+    and drop the fragment and host case so equivalent URLs share a cache key.
+    """
     parsed = urllib.parse.urlparse(url)
     if "linkedin.com" in parsed.netloc and "currentJobId" in parsed.query:
         qs = urllib.parse.parse_qs(parsed.query)
         if "currentJobId" in qs:
             job_id = qs["currentJobId"][0]
-            url = f"https://www.linkedin.com/jobs/view/{job_id}"
+            return f"https://www.linkedin.com/jobs/view/{job_id}"
+    return urllib.parse.urlunparse(parsed._replace(netloc=parsed.netloc.lower(), fragment=""))
+
+
+async def _fetch_page(url: str, headers: dict = None) -> FetchedPage:
+    """
+    GET a page through the shared pool, enforcing the per-host cap and total
+    deadline. The body is streamed and cut off after MAX_PAGE_BYTES.
+    """
+    host = urllib.parse.urlparse(url).netloc.lower()
+    client = _get_client()
+
+    async def fetch():
+        async with _host_slot(host):
+            async with client.stream("GET", url, headers=headers) as resp:
+                if resp.status_code != 304:
+                    resp.raise_for_status()
+                body = bytearray()
+                truncated = False
+                async for chunk in resp.aiter_bytes():
+                    body.extend(chunk)
+                    if len(body) >= MAX_PAGE_BYTES:
+                        truncated = True
+                        del body[MAX_PAGE_BYTES:]
+                        break
+                text = bytes(body).decode(resp.encoding or "utf-8", errors="replace")
+                return FetchedPage(resp.status_code, resp.headers, text, len(body), truncated)
 
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=15, allow_redirects=True)
-        resp.raise_for_status()
-    except requests.RequestException as e:
+        return await asyncio.wait_for(fetch(), timeout=FETCH_DEADLINE)
+    except (asyncio.TimeoutError, httpx.TimeoutException):
+        raise HTTPException(status_code=400, detail=f"Could not fetch URL: timed out after {FETCH_DEADLINE:g}s")
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=400, detail=f"Could not fetch URL: {str(e)}")
 
-    soup = BeautifulSoup(resp.text, "html.parser")
+
+def _find_job_posting(node):
+    """Depth-first search of parsed JSON-LD for a schema.org JobPosting object."""
+    if isinstance(node, list):
+        for item in node:
+            found = _find_job_posting(item)
+            if found:
+                return found
+    elif isinstance(node, dict):
+        types = node.get("@type")
+        types = types if isinstance(types, list) else [types]
+        if "JobPosting" in types:
+            return node
+        return _find_job_posting(node.get("@graph"))
+    return None
+
+
+def _extract_json_ld(page: str):
+    """
+    Fast path: pull the posting out of embedded JobPosting JSON-LD without
+    building a DOM. Returns None when there is no usable JobPosting.
+    """
+    for block in JSON_LD_RE.findall(page):
+        try:
+            posting = _find_job_posting(json.loads(block.strip()))
+        except ValueError:
+            continue
+        if not posting:
+            continue
+
+        title = str(posting.get("title") or "").strip()
+        org = posting.get("hiringOrganization")
+        company = str((org.get("name") if isinstance(org, dict) else org) or "").strip()
+        description = html.unescape(re.sub(r'<[^>]+>', ' ', str(posting.get("description") or "")))
+        description = re.sub(r'[ \t\r\f\v]+', ' ', description)
+        description = re.sub(r'\s*\n\s*', '\n', description).strip()
+        if len(description) < 50:
+            continue
+
+        body = "\n".join(part for part in (title, company, description) if part)
+        return {"title": title, "company": company, "text": body[:MAX_TEXT_CHARS]}
+    return None
+
+
+def _extract_job_text(page: str) -> dict:
+    """
+    Extract the title, company and main text from a job page, preferring
+    JobPosting JSON-LD and falling back to a full DOM parse. The result's
+    "parser" key records which path produced it.
+    """
+    started = time.perf_counter()
+    extracted = _extract_json_ld(page)
+    if extracted is not None:
+        extracted["parser"] = "json-ld"
+    else:
+        extracted = _extract_from_dom(page)
+        extracted["parser"] = "html"
+    extracted["parse_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return extracted
+
+
+def _extract_from_dom(page: str) -> dict:
+    """Extract the title, company and main text by parsing the full HTML."""
+    soup = BeautifulSoup(page, "html.parser")
 
     # Remove script/style tags
     for tag in soup(["script", "style", "nav", "footer", "header", "aside"]):
@@ -66,11 +244,67 @@ def _scrape_job_text(url: str) -> dict:
     body = re.sub(r'\n{3,}', '\n\n', body)
     body = re.sub(r' {2,}', ' ', body)
     # Limit length
-    body = body[:10000]
+    body = body[:MAX_TEXT_CHARS]
 
     return {"title": title, "company": company, "text": body}
 
 
+def _normalise_url(url: str) -> str:
+    """Trim user input and default to https:// when no scheme is given."""
+    url = (url or "").strip()
+    if url and not url.startswith(("http://", "https://")):
+        url = "https://" + url
+    return url
+
+
+async def _scrape_job_text(url: str) -> dict:
+    """
+    Fetch a URL and extract the main text content, going through the scrape
+    cache. The returned dict's "cache" key is "hit", "revalidated" or "miss",
+    and "metrics" describes the bytes read and parse cost of this scan.
+    """
+    url = _canonical_url(url)
+    cached, fresh, validators = await run_in_threadpool(scrape_cache.lookup, url)
+    if cached is not None and fresh:
+        scrape_cache.metrics["hits"] += 1
+        return {**cached, "cache": "hit", "metrics": _scan_summary(None, None)}
+
+    page = await _fetch_page(url, headers=validators if cached is not None else None)
+    if page.status_code == 304 and cached is not None:
+        scrape_cache.metrics["revalidated"] += 1
+        await run_in_threadpool(scrape_cache.mark_revalidated, url)
+        return {**cached, "cache": "revalidated", "metrics": _scan_summary(page, None)}
+
+    scrape_cache.metrics["misses"] += 1
+    # HTML parsing is CPU-bound; keep it off the event loop
+    scraped = await run_in_threadpool(_extract_job_text, page.text)
+    metrics = _scan_summary(page, scraped)
+    await run_in_threadpool(
+        scrape_cache.store, url, scraped,
+        page.headers.get("ETag"), page.headers.get("Last-Modified"),
+    )
+    return {"title": scraped["title"], "company": scraped["company"], "text": scraped["text"],
+            "cache": "miss", "metrics": metrics}
+
+
+def _scan_summary(page, scraped):
+    """Record one scan in scan_metrics and return its own figures."""
+    summary = {
+        "bytes_read": page.bytes_read if page else 0,
+        "truncated": page.truncated if page else False,
+        "parser": scraped["parser"] if scraped else "cache",
+        "parse_ms": scraped["parse_ms"] if scraped else 0,
+    }
+    if page is not None:
+        scan_metrics["pages_fetched"] += 1
+        scan_metrics["bytes_read"] += page.bytes_read
+        scan_metrics["truncated"] += int(page.truncated)
+    if scraped is not None:
+        scan_metrics[scraped["parser"]] += 1
+        scan_metrics["parse_seconds"] += scraped["parse_ms"] / 1000
+    return summary
+
+
 @router.post("/predict-url")
 async def predict_from_url(
     request: dict,
@@ -78,13 +312,11 @@ async def predict_from_url(
     current_user=Depends(get_current_user),
 ):
     """Scrape a job posting URL and analyze it."""
-    url = request.get("url", "").strip()
+    url = _normalise_url(request.get("url", ""))
     if not url:
         raise HTTPException(status_code=400, detail="URL is required")
-    if not url.startswith(("http://", "https://")):
-        url = "https://" + url
 
-    scraped = _scrape_job_text(url)
+    scraped = await _scrape_job_text(url)
     job_text = scraped["text"]
 
     if len(job_text.strip()) < 50:
@@ -105,16 +337,7 @@ async def predict_from_url(
 
     # Log to db
     user_id = current_user.id if current_user else None
-    record = Prediction(
-        user_id=user_id,
-        job_text=job_text[:5000],
-        prediction=result,
-        confidence=round(confidence, 4),
-        created_at=datetime.now(timezone.utc),
-    )
-    db.add(record)
-    db.commit()
-    db.refresh(record)
+    record = log_prediction(db, job_text, result, round(confidence, 4), user_id=user_id)
 
     # Risk breakdown
     risk_factors = _extract_risk_factors(model, vectorizer, features, clean_text)
@@ -127,10 +350,140 @@ async def predict_from_url(
         "scraped_title": scraped["title"],
         "scraped_company": scraped["company"],
         "scraped_preview": job_text[:500],
+        "scrape_cache": scraped["cache"],
+        "scan_metrics": scraped["metrics"],
         "risk_factors": risk_factors,
     }
 
 
+@router.post("/predict-url/batch")
+async def predict_from_urls(
+    request: dict,
+    current_user=Depends(get_current_user),
+):
+    """
+    Scrape and analyze many job posting URLs at once.
+
+    Streams newline-delimited JSON: a "scraped" or "error" line per URL as
+    each fetch finishes, then a "result" line per scraped URL once all texts
+    have been scored together, and a final "summary" line.
+    """
+    urls = []
+    for raw in request.get("urls") or []:
+        url = _normalise_url(raw if isinstance(raw, str) else "")
+        if url and url not in urls:
+            urls.append(url)
+    if not urls:
+        raise HTTPException(status_code=400, detail="At least one URL is required")
+    if len(urls) > MAX_BATCH_URLS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_URLS} URLs per batch")
+
+    model, vectorizer = get_model()
+    user_id = current_user.id if current_user else None
+
+    return StreamingResponse(
+        _stream_batch(urls, model, vectorizer, user_id),
+        media_type="application/x-ndjson",
+    )
+
+
+async def _stream_batch(urls, model, vectorizer, user_id):
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def scrape(url):
+        async with slots:
+            try:
+                return url, await _scrape_job_text(url), None
+            except HTTPException as e:
+                return url, None, e.detail
+            except Exception as e:
+                return url, None, f"Could not process URL: {str(e)}"
+
+    scraped = []
+    errors = 0
+    for task in asyncio.as_completed([scrape(url) for url in urls]):
+        url, page, error = await task
+        if page is not None and len(page["text"].strip()) < 50:
+            page, error = None, "Could not extract enough text from this URL"
+        if page is None:
+            errors += 1
+            yield _ndjson({"type": "error", "url": url, "detail": error})
+            continue
+        scraped.append((url, page))
+        yield _ndjson({"type": "scraped", "url": url, "scraped_title": page["title"],
+                       "scraped_company": page["company"], "scrape_cache": page["cache"],
+                       "scan_metrics": page["metrics"]})
+
+    if scraped:
+        results = await run_in_threadpool(_score_scraped, scraped, model, vectorizer, user_id)
+        for result in results:
+            yield _ndjson(result)
+
+    yield _ndjson({"type": "summary", "total": len(urls), "analyzed": len(scraped), "errors": errors})
+
+
+def _score_scraped(scraped, model, vectorizer, user_id):
+    """Score all scraped pages in one vectorised pass and log them."""
+    from app.database import SessionLocal
+    from app.prediction_logger import BulkPredictionLogger
+
+    clean_texts = [preprocess_text(page["text"]) for _, page in scraped]
+    features = vectorizer.transform(clean_texts)
+    labels = model.predict(features)
+    if hasattr(model, 'predict_proba'):
+        confidences = model.predict_proba(features).max(axis=1)
+    else:
+        confidences = [0.85] * len(clean_texts)
+
+    analyzed_at = datetime.now(timezone.utc)
+    db = SessionLocal()
+    try:
+        logger = BulkPredictionLogger(db, return_ids=True)
+        for (_, page), label, confidence in zip(scraped, labels, confidences):
+            logger.add(page["text"], "Fake" if label == 1 else "Real", round(float(confidence), 4),
+                       user_id=user_id, created_at=analyzed_at)
+        logger.flush()
+        ids = logger.inserted_ids
+    finally:
+        db.close()
+
+    results = []
+    for i, ((url, page), label, confidence) in enumerate(zip(scraped, labels, confidences)):
+        results.append({
+            "type": "result",
+            "url": url,
+            "prediction": "Fake" if label == 1 else "Real",
+            "confidence": round(float(confidence) * 100, 2),
+            "prediction_id": ids[i],
+            "analyzed_at": analyzed_at.isoformat(),
+            "scraped_title": page["title"],
+            "scraped_company": page["company"],
+            "scraped_preview": page["text"][:500],
+            "risk_factors": _extract_risk_factors(model, vectorizer, features[i], clean_texts[i]),
+        })
+    return results
+
+
+@router.get("/predict-url/stats")
+async def scrape_stats():
+    """Scrape cache and fetch/parse counters for this worker."""
+    parsed = scan_metrics["json-ld"] + scan_metrics["html"]
+    return {
+        "cache": scrape_cache.stats(),
+        "scans": {
+            **scan_metrics,
+            "parse_seconds": round(scan_metrics["parse_seconds"], 4),
+            "avg_parse_ms": round(scan_metrics["parse_seconds"] * 1000 / parsed, 2) if parsed else 0,
+            "avg_bytes_read": round(scan_metrics["bytes_read"] / scan_metrics["pages_fetched"])
+            if scan_metrics["pages_fetched"] else 0,
+        },
+    }
+
+
+def _ndjson(payload):
+    return json.dumps(payload) + "\n"
+
+
 def _extract_risk_factors(model, vectorizer, features, clean_text):
     """Extract top risk-contributing features from the prediction."""
     try:
@@ -3,12 +3,13 @@ User Analytics / Stats endpoint for dashboard.
 """
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case
+from sqlalchemy import and_, func, case
 from datetime import datetime, timedelta
 
 from app.database import get_db
-from app.models import Prediction, UserFeedback, FlaggedPost
+from app.models import Prediction, UserDailyRollup, UserStats
 from app.auth import require_auth
+from app.queries import job_text_preview, row_text
 
 router = APIRouter()
 
@@ -21,34 +22,39 @@ async def my_stats(
     """Personal analytics dashboard data for the logged-in user."""
     uid = current_user.id
 
-    # ── Total analyses ──
-    total = db.query(func.count(Prediction.id)).filter(Prediction.user_id == uid).scalar() or 0
-    total_fake = db.query(func.count(Prediction.id)).filter(Prediction.user_id == uid, Prediction.prediction == "Fake").scalar() or 0
-    total_real = total - total_fake
-    avg_conf = db.query(func.avg(Prediction.confidence)).filter(Prediction.user_id == uid).scalar()
-    avg_conf = round(float(avg_conf), 2) if avg_conf else 0
-
-    # ── Weekly trend (last 8 weeks) ──
-    eight_weeks_ago = datetime.utcnow() - timedelta(weeks=8)
-    weekly_rows = (
+    # ── Counters + weekly trend (last 8 weeks), one read keyed on the user's stats row ──
+    eight_weeks_ago = (datetime.utcnow() - timedelta(weeks=8)).date()
+    week = func.strftime('%Y-W%W', UserDailyRollup.day).label("week")
+    rows = (
         db.query(
-            func.strftime('%Y-W%W', Prediction.created_at).label("week"),
-            func.count(Prediction.id).label("count"),
-            func.sum(case((Prediction.prediction == "Fake", 1), else_=0)).label("fake"),
+            UserStats,
+            week,
+            func.sum(UserDailyRollup.count).label("count"),
+            func.sum(case((UserDailyRollup.label == "Fake", UserDailyRollup.count), else_=0)).label("fake"),
+        )
+        .outerjoin(
+            UserDailyRollup,
+            and_(UserDailyRollup.user_id == UserStats.user_id, UserDailyRollup.day >= eight_weeks_ago),
         )
-        .filter(Prediction.user_id == uid, Prediction.created_at >= eight_weeks_ago)
-        .group_by("week")
-        .order_by("week")
+        .filter(UserStats.user_id == uid)
+        .group_by(UserStats.user_id, week)
+        .order_by(week)
         .all()
     )
+    stats = rows[0].UserStats if rows else UserStats(total=0, fake=0, confidence_sum=0, feedback_given=0, feedback_agree=0)
+    total = stats.total
+    total_fake = stats.fake
+    total_real = total - total_fake
+    avg_conf = round(float(stats.confidence_sum) / total, 2) if total else 0
+
     weekly_trend = [
         {"week": r.week, "total": r.count, "fake": int(r.fake or 0), "real": r.count - int(r.fake or 0)}
-        for r in weekly_rows
+        for r in rows if r.week is not None
     ]
 
     # ── Recent predictions ──
     recent = (
-        db.query(Prediction)
+        db.query(Prediction.id, *job_text_preview(120), Prediction.prediction, Prediction.confidence, Prediction.created_at)
         .filter(Prediction.user_id == uid)
         .order_by(Prediction.created_at.desc())
         .limit(20)
@@ -59,16 +65,12 @@ async def my_stats(
             "id": p.id,
             "prediction": p.prediction,
             "confidence": p.confidence,
-            "preview": (p.job_text or "")[:120],
+            "preview": row_text(p)[:120],
             "created_at": p.created_at.isoformat() if p.created_at else None,
         }
         for p in recent
     ]
 
-    # ── Feedback summary ──
-    fb_total = db.query(func.count(UserFeedback.id)).filter(UserFeedback.user_id == uid).scalar() or 0
-    fb_agree = db.query(func.count(UserFeedback.id)).filter(UserFeedback.user_id == uid, UserFeedback.feedback == "agree").scalar() or 0
-
     return {
         "total_analyses": total,
         "total_fake": total_fake,
@@ -77,7 +79,7 @@ async def my_stats(
         "fraud_rate": round((total_fake / total * 100), 1) if total > 0 else 0,
         "weekly_trend": weekly_trend,
         "recent_predictions": recent_list,
-        "feedback_given": fb_total,
-        "feedback_agree": fb_agree,
+        "feedback_given": stats.feedback_given,
+        "feedback_agree": stats.feedback_agree,
         "member_since": current_user.created_at.isoformat() if current_user.created_at else None,
     }
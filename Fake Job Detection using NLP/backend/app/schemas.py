@@ -35,6 +35,7 @@ class TokenResponse(BaseModel):
 # ── Prediction Schemas ────────────────────────────
 class PredictRequest(BaseModel):
     job_text: str = Field(..., min_length=10, max_length=50000)
+    detect_companies: bool = False
 
 class PredictResponse(BaseModel):
     prediction: str
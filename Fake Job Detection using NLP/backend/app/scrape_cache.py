@@ -0,0 +1,108 @@
+"""
+Scrape cache — extracted job-page content keyed by canonical URL.
+
+Entries are served without touching the network for SCRAPE_CACHE_TTL
+seconds after the origin last confirmed them; after that they are
+revalidated with If-None-Match / If-Modified-Since. The table is capped at
+SCRAPE_CACHE_MAX_ENTRIES rows, evicting the least recently used.
+"""
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.database import SessionLocal
+from app.models import ScrapeCacheEntry
+
+TTL_SECONDS = int(os.getenv("SCRAPE_CACHE_TTL", "3600"))
+MAX_ENTRIES = int(os.getenv("SCRAPE_CACHE_MAX_ENTRIES", "5000"))
+
+metrics = {"hits": 0, "revalidated": 0, "misses": 0, "evictions": 0}
+
+
+def _as_dict(entry):
+    return {"title": entry.title or "", "company": entry.company or "", "text": entry.text}
+
+
+def lookup(url):
+    """
+    Return (content, fresh, validators) for a cached URL, or (None, False, {}).
+    `validators` holds the conditional-request headers for a stale entry.
+    """
+    db = SessionLocal()
+    try:
+        entry = db.query(ScrapeCacheEntry).filter(ScrapeCacheEntry.url == url).first()
+        if entry is None:
+            return None, False, {}
+        now = datetime.utcnow()
+        fresh = entry.validated_at is not None and now - entry.validated_at < timedelta(seconds=TTL_SECONDS)
+        validators = {}
+        if entry.etag:
+            validators["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            validators["If-Modified-Since"] = entry.last_modified
+        entry.last_used_at = now
+        db.commit()
+        return _as_dict(entry), fresh, validators
+    finally:
+        db.close()
+
+
+def mark_revalidated(url):
+    """The origin answered 304: restart the entry's TTL."""
+    db = SessionLocal()
+    try:
+        db.query(ScrapeCacheEntry).filter(ScrapeCacheEntry.url == url).update(
+            {"validated_at": datetime.utcnow()}
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def store(url, content, etag=None, last_modified=None):
+    """
+    Insert or replace the cached content for a URL, then enforce the size
+    cap. A single upsert, so concurrent scrapes of one URL cannot collide
+    on its unique key.
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        values = {
+            "title": content["title"],
+            "company": content["company"],
+            "text": content["text"],
+            "etag": etag,
+            "last_modified": last_modified,
+            "validated_at": now,
+            "last_used_at": now,
+        }
+        stmt = sqlite_insert(ScrapeCacheEntry).values(url=url, **values)
+        db.execute(stmt.on_conflict_do_update(index_elements=["url"], set_=values))
+        db.commit()
+        _evict(db)
+    finally:
+        db.close()
+
+
+def _evict(db):
+    excess = db.query(ScrapeCacheEntry).count() - MAX_ENTRIES
+    if excess <= 0:
+        return
+    oldest = (
+        db.query(ScrapeCacheEntry.id)
+        .order_by(ScrapeCacheEntry.last_used_at.asc())
+        .limit(excess)
+        .subquery()
+    )
+    db.query(ScrapeCacheEntry).filter(ScrapeCacheEntry.id.in_(oldest.select())).delete(synchronize_session=False)
+    db.commit()
+    metrics["evictions"] += excess
+
+
+def stats():
+    """Hit/miss counters for this process."""
+    lookups = metrics["hits"] + metrics["revalidated"] + metrics["misses"]
+    served = metrics["hits"] + metrics["revalidated"]
+    return {**metrics, "hit_rate": round(served / lookups * 100, 1) if lookups else 0}
@@ -0,0 +1,50 @@
+"""
+Short-lived in-process cache for the /stats dashboard response.
+
+An entry is served until STATS_CACHE_TTL seconds pass or invalidate() is
+called (new predictions, flags, model reloads). Each entry carries an ETag
+so polling clients can revalidate with If-None-Match and get a 304.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+
+TTL_SECONDS = float(os.getenv("STATS_CACHE_TTL", "10"))
+
+_lock = threading.Lock()
+_generation = 0  # Bumped on every invalidation
+_entry = None  # (generation, expires_at, body, etag)
+
+
+def invalidate():
+    """Drop the cached response; the next request recomputes it."""
+    global _generation
+    with _lock:
+        _generation += 1
+
+
+def current_generation():
+    return _generation
+
+
+def get():
+    """(body, etag) of the cached response, or None when stale."""
+    entry = _entry
+    if entry is None or entry[0] != _generation or time.monotonic() >= entry[1]:
+        return None
+    return entry[2], entry[3]
+
+
+def put(body, generation):
+    """
+    Cache `body` computed at `generation`. If an invalidation happened
+    while it was being computed, it is returned but not cached.
+    """
+    global _entry
+    etag = '"' + hashlib.sha1(json.dumps(body, sort_keys=True, default=str).encode("utf-8")).hexdigest() + '"'
+    with _lock:
+        if generation == _generation:
+            _entry = (generation, time.monotonic() + TTL_SECONDS, body, etag)
+    return body, etag
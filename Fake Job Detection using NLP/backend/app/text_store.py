@@ -0,0 +1,88 @@
+"""
+Content-addressed storage for posting text.
+
+Each distinct text is stored once in job_texts, zlib-compressed and keyed
+by its SHA-256; predictions reference it through text_hash and keep an
+empty job_text. Rows logged before this existed still carry their text
+inline until `python backfill.py texts` moves it.
+"""
+import zlib
+import hashlib
+
+from sqlalchemy import LargeBinary, cast, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.models import JobText, Prediction
+
+COMPRESSION_LEVEL = 6
+RAW_MARKER = b"\x00"  # Prefix for texts stored uncompressed; zlib output never starts with it
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def compress(text):
+    """Stored form of `text`: zlib data, or the raw bytes when that is not smaller."""
+    raw = text.encode("utf-8")
+    packed = zlib.compress(raw, COMPRESSION_LEVEL)
+    return packed if len(packed) <= len(raw) else RAW_MARKER + raw
+
+
+def decompress(body):
+    if body[:1] == RAW_MARKER:
+        return bytes(body[1:]).decode("utf-8")
+    return zlib.decompress(body).decode("utf-8")
+
+
+def store(db, texts):
+    """
+    Make sure every text is stored (uncommitted) and return their hashes in
+    order. Texts already present are neither compressed nor written again.
+    """
+    hashes = [text_hash(t) for t in texts]
+    distinct = dict(zip(hashes, texts))
+    existing = set(db.scalars(select(JobText.hash).where(JobText.hash.in_(list(distinct)))))
+    new_rows = [
+        {"hash": h, "body": compress(t), "raw_size": len(t.encode("utf-8"))}
+        for h, t in distinct.items() if h not in existing
+    ]
+    if new_rows:
+        # Another writer may store the same text between the check and the insert
+        db.execute(sqlite_insert(JobText).on_conflict_do_nothing(index_elements=["hash"]), new_rows)
+    return hashes
+
+
+def load(db, hashes):
+    """{hash: text} for the given hashes."""
+    rows = db.execute(select(JobText.hash, JobText.body).where(JobText.hash.in_(list(set(hashes)))))
+    return {h: decompress(body) for h, body in rows}
+
+
+def report(db):
+    """Bytes posting text would take inline versus what is stored now."""
+    referenced = db.execute(
+        select(func.count(Prediction.id), func.coalesce(func.sum(JobText.raw_size), 0))
+        .join(JobText, JobText.hash == Prediction.text_hash)
+    ).one()
+    unique = db.execute(
+        select(func.count(JobText.hash), func.coalesce(func.sum(func.length(JobText.body)), 0),
+               func.coalesce(func.sum(JobText.raw_size), 0))
+    ).one()
+    inline = db.execute(
+        select(func.count(Prediction.id), func.coalesce(func.sum(func.length(cast(Prediction.job_text, LargeBinary))), 0))
+        .where(Prediction.text_hash.is_(None))
+    ).one()
+
+    raw_bytes = referenced[1] + inline[1]
+    stored_bytes = unique[1] + inline[1]
+    return {
+        "predictions": referenced[0] + inline[0],
+        "inline_predictions": inline[0],
+        "unique_texts": unique[0],
+        "raw_bytes": raw_bytes,
+        "unique_raw_bytes": unique[2],
+        "stored_bytes": stored_bytes,
+        "saved_bytes": raw_bytes - stored_bytes,
+        "saved_percent": round((raw_bytes - stored_bytes) / raw_bytes * 100, 1) if raw_bytes else 0,
+    }
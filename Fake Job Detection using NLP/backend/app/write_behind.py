@@ -0,0 +1,313 @@
+"""
+Write-behind prediction logging (opt-in with PREDICTION_WRITE_BEHIND=1).
+
+Scoring routes call log_prediction() here. When write-behind is enabled
+the prediction gets its ID from a block reserved up front, the row is
+queued in memory and the route responds without waiting for a commit. A
+background thread writes the queue in batches every FLUSH_INTERVAL
+seconds, together with its tags, rollups and user counters.
+
+Queued rows are lost if the process dies without a clean shutdown.
+shutdown() drains the queue, and stats() reports how much is unwritten and
+for how long. When the queue is full, a row is written synchronously
+instead. Routes that need the row in the database (feedback, flags) await
+require_written() first. The queue only exists in the worker that scored
+the posting, so with several workers a missing prediction whose ID has
+already been reserved gets prediction_not_found()'s 503 and a retry
+rather than a 404. With write-behind disabled log_prediction() is
+app.prediction_logger.log_prediction().
+
+A batch that keeps failing is retried one row at a time, and a row that
+still fails on its own is appended to SET_ASIDE_PATH instead of blocking
+the rows queued behind it.
+"""
+import os
+import json
+import time
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from itertools import islice
+
+from fastapi import HTTPException
+from sqlalchemy.exc import OperationalError
+from starlette.concurrency import run_in_threadpool
+
+from app import prediction_logger
+from app.database import SessionLocal
+from app.models import Prediction
+
+ENABLED = prediction_logger.WRITE_BEHIND
+QUEUE_MAX = int(os.getenv("PREDICTION_QUEUE_MAX", "10000"))  # Queued rows before writes go synchronous
+FLUSH_INTERVAL = float(os.getenv("PREDICTION_FLUSH_INTERVAL", "0.2"))  # Seconds between background flushes
+BATCH_SIZE = 500
+ID_BLOCK_SIZE = 100  # IDs reserved per database round trip
+ENSURE_TIMEOUT = 5.0  # Seconds ensure_written() waits for a queued row
+RETRY_DELAY = 1.0  # Seconds to back off after a failed flush
+MAX_FLUSH_ATTEMPTS = 3  # Failed batch writes before falling back to one row at a time
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SET_ASIDE_PATH = os.getenv(
+    "PREDICTION_SET_ASIDE_PATH", os.path.join(BACKEND_DIR, "data", "unwritten_predictions.jsonl")
+)  # Rows that could not be written, one JSON object per line
+
+_queue = deque()  # (enqueued_at, row)
+_pending_ids = set()
+_cond = threading.Condition()
+_flush_lock = threading.Lock()  # One flush at a time, so a batch is never written twice
+_wakeup = threading.Event()
+_stopping = False
+_thread = None
+
+_id_lock = threading.Lock()
+_next_id = 0
+_block_end = 0
+
+_metrics = {
+    "enqueued": 0,
+    "written": 0,
+    "batches": 0,
+    "sync_writes": 0,
+    "flush_failures": 0,
+    "set_aside": 0,
+    "max_queue_depth": 0,
+    "flush_seconds": 0.0,
+}
+_last_error = None
+_last_flush_at = None
+_failed_attempts = 0  # Consecutive failed writes of the oldest batch
+
+
+def _allocate_id():
+    global _next_id, _block_end
+    with _id_lock:
+        if _next_id >= _block_end:
+            db = SessionLocal()
+            try:
+                first = prediction_logger.reserve_ids(db, ID_BLOCK_SIZE)
+                db.commit()
+            finally:
+                db.close()
+            _next_id, _block_end = first, first + ID_BLOCK_SIZE
+        _next_id += 1
+        return _next_id - 1
+
+
+def _ensure_started():
+    global _thread
+    if _thread is None or not _thread.is_alive():
+        with _cond:
+            if _thread is None or not _thread.is_alive():
+                _thread = threading.Thread(target=_run, name="prediction-write-behind", daemon=True)
+                _thread.start()
+
+
+def log_prediction(db, job_text, prediction, confidence, user_id=None, model_used="model_a", max_length=5000):
+    """
+    Log one prediction. Returns a Prediction whose id and created_at are set;
+    with write-behind enabled it is not yet in the database.
+    """
+    if not ENABLED:
+        return prediction_logger.log_prediction(
+            db, job_text, prediction, confidence, user_id=user_id, model_used=model_used, max_length=max_length,
+        )
+
+    _ensure_started()
+    row = {
+        "id": _allocate_id(),
+        "user_id": user_id,
+        "job_text": job_text[:max_length],
+        "prediction": prediction,
+        "confidence": confidence,
+        "model_used": model_used,
+        "created_at": datetime.now(timezone.utc),
+    }
+    with _cond:
+        queued = len(_queue) < QUEUE_MAX and not _stopping
+        if queued:
+            _queue.append((time.monotonic(), row))
+            _pending_ids.add(row["id"])
+            _metrics["enqueued"] += 1
+            _metrics["max_queue_depth"] = max(_metrics["max_queue_depth"], len(_queue))
+        else:
+            _metrics["sync_writes"] += 1
+        full_batch = len(_queue) >= BATCH_SIZE
+    if not queued:
+        return prediction_logger.log_prediction(
+            db, row["job_text"], prediction, confidence, user_id=user_id, model_used=model_used,
+            created_at=row["created_at"], max_length=max_length, prediction_id=row["id"],
+        )
+    if full_batch:
+        _wakeup.set()
+    return Prediction(**row)
+
+
+def ensure_written(prediction_id, timeout=ENSURE_TIMEOUT):
+    """
+    Wait until a queued prediction has been written, flushing right away.
+    Returns False if it is still queued after `timeout` seconds.
+    """
+    if prediction_id not in _pending_ids:
+        return True
+    _wakeup.set()
+    with _cond:
+        return _cond.wait_for(lambda: prediction_id not in _pending_ids, timeout)
+
+
+async def require_written(prediction_id):
+    """
+    ensure_written() for async routes: waits in the threadpool and raises
+    503 if the prediction is still queued after ENSURE_TIMEOUT.
+    """
+    if prediction_id not in _pending_ids:
+        return
+    if not await run_in_threadpool(ensure_written, prediction_id):
+        raise _still_saving()
+
+
+def prediction_not_found(db, prediction_id):
+    """
+    The error for a prediction that is not in the database: 503 when
+    write-behind is enabled and the ID has been reserved, since another
+    worker may still have it queued, otherwise 404.
+    """
+    if ENABLED and prediction_logger.is_reserved(db, prediction_id):
+        return _still_saving()
+    return HTTPException(status_code=404, detail="Prediction not found")
+
+
+def _still_saving():
+    return HTTPException(
+        status_code=503,
+        detail="Prediction is still being saved, please retry",
+        headers={"Retry-After": str(int(RETRY_DELAY) + 1)},
+    )
+
+
+def _flush_batch():
+    """Write the oldest queued batch. Returns False when the queue is empty or the write failed."""
+    with _flush_lock:
+        return _write_oldest_batch()
+
+
+def _write(rows):
+    db = SessionLocal()
+    try:
+        prediction_logger.write_rows(db, rows)
+    finally:
+        db.close()
+
+
+def _note_failure(error):
+    global _last_error
+    _metrics["flush_failures"] += 1
+    _last_error = f"{type(error).__name__}: {error}"
+
+
+def _set_aside(row):
+    record = {**row, "created_at": row["created_at"].isoformat(), "error": _last_error}
+    os.makedirs(os.path.dirname(SET_ASIDE_PATH), exist_ok=True)
+    with open(SET_ASIDE_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, default=str) + "\n")
+    _metrics["set_aside"] += 1
+    print(f"[WARN] Prediction {row['id']} could not be written and was set aside: {_last_error}")
+
+
+def _write_one_by_one(batch):
+    """
+    Write rows in separate transactions. Returns (rows handled, rows written);
+    a row that fails is set aside unless the database itself is unavailable,
+    in which case it and the rows after it stay queued.
+    """
+    written = 0
+    for handled, row in enumerate(batch):
+        try:
+            _write([row])
+        except OperationalError as e:  # Locked, unreachable or out of space
+            _note_failure(e)
+            return handled, written
+        except Exception as e:
+            _note_failure(e)
+            _set_aside(row)
+        else:
+            written += 1
+    return len(batch), written
+
+
+def _write_oldest_batch():
+    global _last_flush_at, _failed_attempts
+    with _cond:
+        batch = [row for _, row in islice(_queue, BATCH_SIZE)]
+    if not batch:
+        return False
+
+    started = time.perf_counter()
+    try:
+        _write(batch)
+        handled = written = len(batch)
+    except Exception as e:
+        _note_failure(e)
+        _failed_attempts += 1
+        if _failed_attempts < MAX_FLUSH_ATTEMPTS:
+            return False  # Rows stay queued for the next attempt
+        handled, written = _write_one_by_one(batch)
+    if handled == len(batch):
+        _failed_attempts = 0
+
+    with _cond:
+        for _ in range(handled):
+            _queue.popleft()
+        _pending_ids.difference_update(row["id"] for row in batch[:handled])
+        _cond.notify_all()
+    _metrics["written"] += written
+    _metrics["batches"] += 1
+    _metrics["flush_seconds"] += time.perf_counter() - started
+    _last_flush_at = datetime.now(timezone.utc)
+    return handled == len(batch)
+
+
+def _flush_all():
+    while _queue:
+        if not _flush_batch():
+            return False
+    return True
+
+
+def _run():
+    while True:
+        _wakeup.wait(FLUSH_INTERVAL)
+        _wakeup.clear()
+        if not _flush_all() and _queue:
+            time.sleep(RETRY_DELAY)
+        if _stopping and not _queue:
+            return
+
+
+def shutdown():
+    """Stop accepting rows and write everything still queued (called on application shutdown)."""
+    global _stopping, _thread
+    _stopping = True
+    _wakeup.set()
+    if _thread is not None:
+        _thread.join(timeout=30)
+        _thread = None
+    if _queue and not _flush_all():
+        print(f"[WARN] {len(_queue)} queued predictions could not be written: {_last_error}")
+
+
+def stats():
+    """Queue and durability counters for the write-behind logger."""
+    with _cond:
+        depth = len(_queue)
+        oldest = _queue[0][0] if _queue else None
+    batches = _metrics["batches"]
+    return {
+        "enabled": ENABLED,
+        "queue_depth": depth,
+        "queue_max": QUEUE_MAX,
+        "oldest_unwritten_ms": round((time.monotonic() - oldest) * 1000, 1) if oldest is not None else 0,
+        "flush_interval_ms": FLUSH_INTERVAL * 1000,
+        **{k: v for k, v in _metrics.items() if k != "flush_seconds"},
+        "avg_flush_ms": round(_metrics["flush_seconds"] / batches * 1000, 2) if batches else 0,
+        "last_flush_at": _last_flush_at.isoformat() if _last_flush_at else None,
+        "last_error": _last_error,
+    }
@@ -0,0 +1,140 @@
+"""
+Backfill derived tables from the predictions already in the database.
+
+Usage:
+    cd backend
+    python backfill.py tags     # rebuild scam-pattern tags (e.g. after editing SCAM_PATTERNS)
+    python backfill.py rollups  # rebuild the daily rollup tables
+    python backfill.py user-stats  # report drifted per-user counters, then rebuild them
+    python backfill.py texts    # move inline posting text into job_texts, then report
+    python backfill.py text-report  # storage used by posting text, without migrating
+
+Tags and texts are processed in id order, BATCH_SIZE at a time, each batch
+in its own transaction. Rollups and user counters are recomputed with GROUP BY
+queries.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import bindparam, delete, insert, select, text, update
+
+from app import rollups, text_store
+from app.database import init_db, engine, SessionLocal
+from app.models import Prediction, PredictionTag
+from app.scam_patterns import tag_rows
+
+BATCH_SIZE = 1000
+
+
+def backfill_tags(db):
+    db.execute(delete(PredictionTag))
+    db.commit()
+
+    last_id, tagged, total = 0, 0, 0
+    while True:
+        rows = db.execute(
+            select(Prediction.id, Prediction.prediction, Prediction.job_text, Prediction.text_hash,
+                   Prediction.repeat_count, Prediction.created_at)
+            .where(Prediction.id > last_id, Prediction.prediction == "Fake")
+            .order_by(Prediction.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        texts = text_store.load(db, [r.text_hash for r in rows if r.text_hash])
+        tags = tag_rows((r.id, {**r._asdict(), "job_text": texts.get(r.text_hash, r.job_text)}) for r in rows)
+        if tags:
+            db.execute(insert(PredictionTag), tags)
+        db.commit()
+        last_id = rows[-1].id
+        total += len(rows)
+        tagged += len(tags)
+    print(f"✓ {tagged} tags written for {total} fake predictions")
+
+
+def backfill_rollups(db):
+    daily, per_user = rollups.rebuild(db)
+    print(f"✓ {daily} daily and {per_user} per-user rollup rows rebuilt")
+
+
+def backfill_user_stats(db):
+    drifted = rollups.check_user_stats(db)
+    if drifted:
+        shown = ", ".join(map(str, drifted[:20])) + (" ..." if len(drifted) > 20 else "")
+        print(f"⚠ Counters out of sync for {len(drifted)} user(s): {shown}")
+    else:
+        print("✓ All user counters match")
+    users = rollups.rebuild_user_stats(db)
+    print(f"✓ Counters rebuilt for {users} user(s)")
+
+
+def _print_text_report(db):
+    r = text_store.report(db)
+    mb = lambda n: f"{n / 1024 / 1024:.2f} MB"
+    print(f"  predictions        {r['predictions']} ({r['inline_predictions']} still inline)")
+    print(f"  unique texts       {r['unique_texts']} ({mb(r['unique_raw_bytes'])} uncompressed)")
+    print(f"  text as inline     {mb(r['raw_bytes'])}")
+    print(f"  text as stored     {mb(r['stored_bytes'])}")
+    print(f"  saved              {mb(r['saved_bytes'])} ({r['saved_percent']}%)")
+
+
+def backfill_texts(db):
+    size_before = os.path.getsize(engine.url.database)
+    stmt = (
+        update(Prediction.__table__)
+        .where(Prediction.__table__.c.id == bindparam("pid"))
+        .values(job_text="", text_hash=bindparam("hash"))
+    )
+    last_id, moved = 0, 0
+    while True:
+        rows = db.execute(
+            select(Prediction.id, Prediction.job_text)
+            .where(Prediction.id > last_id, Prediction.text_hash.is_(None))
+            .order_by(Prediction.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        hashes = text_store.store(db, [r.job_text for r in rows])
+        db.execute(stmt, [{"pid": r.id, "hash": h} for r, h in zip(rows, hashes)])
+        db.commit()
+        last_id = rows[-1].id
+        moved += len(rows)
+    print(f"✓ {moved} predictions moved to deduplicated text storage")
+    _print_text_report(db)
+
+    db.close()
+    with engine.connect() as conn:
+        conn.execute(text("VACUUM"))  # Hand the freed pages back to the filesystem
+        conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+    print(f"✓ Database file {size_before / 1024 / 1024:.2f} MB -> {os.path.getsize(engine.url.database) / 1024 / 1024:.2f} MB")
+
+
+def backfill_text_report(db):
+    _print_text_report(db)
+
+
+COMMANDS = {
+    "tags": backfill_tags,
+    "rollups": backfill_rollups,
+    "user-stats": backfill_user_stats,
+    "texts": backfill_texts,
+    "text-report": backfill_text_report,
+}
+
+
+def main():
+    if len(sys.argv) != 2 or sys.argv[1] not in COMMANDS:
+        sys.exit(f"Usage: python backfill.py {{{'|'.join(COMMANDS)}}}")
+    init_db()
+    db = SessionLocal()
+    try:
+        COMMANDS[sys.argv[1]](db)
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Database concurrency benchmark - mixed read/write traffic against the
+default SQLite engine (rollback journal) and the tuned one from
+app/database.py.
+
+Usage:
+    cd backend
+    python bench_db.py                                # 16 threads, 5 s, 20% writes
+    python bench_db.py --threads 32 --seconds 10 --write-ratio 0.5
+
+Each configuration gets a fresh temporary database seeded with users and
+predictions. Writes log a prediction through log_prediction() (insert,
+tags, rollups and user counters in one transaction); reads fetch a page of
+a user's history and their /my-stats row. Errors are mostly
+"database is locked".
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_sqlite_engine
+from app.models import Prediction, User, UserStats
+from app.prediction_logger import BulkPredictionLogger, log_prediction
+from app.queries import job_text_preview, newest_first_page
+
+USERS = 50
+SEED_PREDICTIONS = 20000
+POSTINGS = [
+    "Earn $5000 weekly working from home. Pay the registration fee and message us on WhatsApp.",
+    "Backend engineer to build payment APIs. Five years of Python and PostgreSQL experience.",
+    "Urgent hiring! Limited spots, send your bank details to start today.",
+]
+
+
+def _seed(session_factory):
+    db = session_factory()
+    db.add_all(User(username=f"bench{i}", email=f"bench{i}@example.com", password_hash="x") for i in range(USERS))
+    db.commit()
+    rng = random.Random(0)
+    with BulkPredictionLogger(db) as logger:
+        for _ in range(SEED_PREDICTIONS):
+            logger.add(rng.choice(POSTINGS), rng.choice(["Fake", "Real"]), rng.random(), user_id=rng.randint(1, USERS))
+    db.close()
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def _worker(session_factory, deadline, write_ratio, seed, results):
+    rng = random.Random(seed)
+    reads, writes, errors = [], [], 0
+    while time.perf_counter() < deadline:
+        db = session_factory()
+        user_id = rng.randint(1, USERS)
+        started = time.perf_counter()
+        try:
+            if rng.random() < write_ratio:
+                log_prediction(db, rng.choice(POSTINGS), rng.choice(["Fake", "Real"]), rng.random(), user_id=user_id)
+                writes.append(time.perf_counter() - started)
+            else:
+                query = db.query(Prediction.id, *job_text_preview(), Prediction.created_at).filter(Prediction.user_id == user_id)
+                newest_first_page(query, None, 10)
+                db.get(UserStats, user_id)
+                reads.append(time.perf_counter() - started)
+        except OperationalError:
+            db.rollback()
+            errors += 1
+        finally:
+            db.close()
+    results.append((reads, writes, errors))
+
+
+def run(name, engine, threads, seconds, write_ratio):
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    _seed(session_factory)
+
+    results = []
+    deadline = time.perf_counter() + seconds
+    workers = [
+        threading.Thread(target=_worker, args=(session_factory, deadline, write_ratio, i, results))
+        for i in range(threads)
+    ]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+
+    reads = [t for r, _, _ in results for t in r]
+    writes = [t for _, w, _ in results for t in w]
+    errors = sum(e for _, _, e in results)
+    print(f"{name:<10}{(len(reads) + len(writes)) / elapsed:>10.0f}{len(reads) / elapsed:>10.0f}"
+          f"{len(writes) / elapsed:>10.0f}{_percentile(reads, 95) * 1000:>12.1f}"
+          f"{_percentile(writes, 50) * 1000:>12.1f}{_percentile(writes, 95) * 1000:>12.1f}{errors:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads, {args.seconds:g} s, {args.write_ratio:.0%} writes, "
+          f"{SEED_PREDICTIONS} seeded predictions\n")
+    print(f"{'engine':<10}{'ops/s':>10}{'reads/s':>10}{'writes/s':>10}{'read p95':>12}"
+          f"{'write p50':>12}{'write p95':>12}{'errors':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        default_url = f"sqlite:///{os.path.join(tmp, 'default.db')}"
+        tuned_url = f"sqlite:///{os.path.join(tmp, 'tuned.db')}"
+        run("default", create_engine(default_url, connect_args={"check_same_thread": False}),
+            args.threads, args.seconds, args.write_ratio)
+        run("tuned", create_sqlite_engine(tuned_url), args.threads, args.seconds, args.write_ratio)
+    print("\nTimes in ms. Errors are operations that failed with an OperationalError (database is locked).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+OCR preprocessing benchmark - compares OCR latency and extracted-text quality
+with and without the image normalisation stage in app/routes/ocr.py.
+
+Usage:
+    cd backend
+    python bench_ocr.py                  # synthetic job-posting screenshots
+    python bench_ocr.py path/to/images   # your own images (no ground truth)
+
+Text quality is the similarity (0-100) between the OCR output and the known
+text of each synthetic screenshot. Without a Tesseract binary only the
+preprocessing cost is measured.
+"""
+import io
+import os
+import sys
+import time
+import random
+from difflib import SequenceMatcher
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image, ImageDraw, ImageFont
+
+from app.routes.ocr import _extract_text_from_image, _prepare_image
+
+SAMPLE_POSTINGS = [
+    "URGENT HIRING Data Entry Clerk. Work from home and earn 5000 dollars weekly. "
+    "No experience needed. Pay a small registration fee to start today.",
+    "Software Engineer at Stripe. Build payment APIs used by millions of businesses. "
+    "Five years of backend experience with distributed systems required.",
+    "Congratulations you are selected for a remote assistant role. Send your bank "
+    "details and passport number on WhatsApp to receive your starter kit.",
+]
+
+
+def _wrap(text, width=48):
+    lines, line = [], ""
+    for word in text.split():
+        if len(line) + len(word) + 1 > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}".strip()
+    lines.append(line)
+    return lines
+
+
+def synthetic_screenshot(text, seed):
+    """Render text onto a large, colourful, noisy phone-style screenshot."""
+    rng = random.Random(seed)
+    img = Image.new("RGB", (3000, 4000), (rng.randint(200, 255), rng.randint(200, 255), rng.randint(200, 255)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(4000):  # background speckle
+        x, y = rng.randint(0, 2999), rng.randint(0, 3999)
+        shade = rng.randint(150, 230)
+        draw.point((x, y), fill=(shade, shade, shade))
+    try:
+        font = ImageFont.load_default(size=64)
+    except TypeError:
+        font = ImageFont.load_default()
+    y = 900
+    for line in _wrap(text):
+        draw.text((400, y), line, fill=(30, 30, 60), font=font)
+        y += 90
+    buf = io.BytesIO()
+    img.save(buf, "PNG", dpi=(460, 460))
+    return buf.getvalue()
+
+
+def _quality(expected, actual):
+    norm = lambda s: " ".join(s.lower().split())
+    return round(SequenceMatcher(None, norm(expected), norm(actual)).ratio() * 100, 1)
+
+
+def _tesseract_available():
+    try:
+        import pytesseract
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+
+def run(samples):
+    has_tesseract = _tesseract_available()
+    if not has_tesseract:
+        print("Tesseract not found - measuring preprocessing cost only.\n")
+
+    print(f"{'image':<28}{'bytes':>10}  {'mode':<6}{'ocr ms':>9}{'quality':>9}{'size':>14}")
+    totals = {True: [0.0, 0.0, 0], False: [0.0, 0.0, 0]}
+    for name, image_bytes, expected in samples:
+        for preprocess in (False, True):
+            img = Image.open(io.BytesIO(image_bytes))
+            size = _prepare_image(img).size if preprocess else img.size
+
+            started = time.perf_counter()
+            if has_tesseract:
+                text = _extract_text_from_image(image_bytes, preprocess=preprocess)
+            else:
+                text = ""
+                if preprocess:
+                    _prepare_image(Image.open(io.BytesIO(image_bytes)))
+            elapsed = (time.perf_counter() - started) * 1000
+
+            quality = _quality(expected, text) if (expected and has_tesseract) else None
+            totals[preprocess][0] += elapsed
+            totals[preprocess][1] += quality or 0
+            totals[preprocess][2] += 1
+            print(f"{name:<28}{len(image_bytes):>10}  {'prep' if preprocess else 'raw':<6}"
+                  f"{elapsed:>9.1f}{quality if quality is not None else '-':>9}"
+                  f"{f'{size[0]}x{size[1]}':>14}")
+
+    print()
+    for preprocess in (False, True):
+        ms, quality, n = totals[preprocess]
+        label = "with preprocessing" if preprocess else "without preprocessing"
+        line = f"{label:<24} avg {ms / n:8.1f} ms"
+        if has_tesseract and any(expected for _, _, expected in samples):
+            line += f"   avg quality {quality / n:5.1f}"
+        print(line)
+
+
+def main():
+    if len(sys.argv) > 1:
+        folder = sys.argv[1]
+        samples = []
+        for name in sorted(os.listdir(folder)):
+            path = os.path.join(folder, name)
+            if os.path.isfile(path):
+                with open(path, "rb") as f:
+                    samples.append((name, f.read(), None))
+    else:
+        samples = [
+            (f"synthetic_{i}.png", synthetic_screenshot(text, i), text)
+            for i, text in enumerate(SAMPLE_POSTINGS)
+        ]
+    run(samples)
+
+
+if __name__ == '__main__':
+    main()
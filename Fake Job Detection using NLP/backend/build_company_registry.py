@@ -0,0 +1,45 @@
+"""
+Company registry compiler - turns a company list into the memory-mapped
+registry served by the company verification and mention endpoints.
+
+Usage:
+    cd backend
+    python build_company_registry.py                       # data/known_companies.json
+    python build_company_registry.py path/to/companies.json
+
+The input is a JSON list of objects with at least a "name" key. The new
+version is written next to the previous ones and published by swapping
+data/company_registry/CURRENT; running servers pick it up within
+COMPANY_REGISTRY_CHECK seconds without a restart.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.company_registry import SOURCE_PATH, compile_registry, save_registry
+
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else SOURCE_PATH
+    with open(source, "rb") as f:
+        raw = f.read()
+    companies = json.loads(raw)
+    if not isinstance(companies, list) or not all(isinstance(c, dict) and c.get("name") for c in companies):
+        sys.exit(f"[ERROR] {source} must be a JSON list of objects with a 'name'")
+
+    started = time.perf_counter()
+    arrays = compile_registry(companies)
+    version = time.strftime("%Y%m%d-%H%M%S-") + hashlib.sha256(raw).hexdigest()[:8]
+    version_dir = save_registry(arrays, version)
+
+    size = sum(os.path.getsize(os.path.join(version_dir, n)) for n in os.listdir(version_dir))
+    print(f"[OK] {len(companies)} companies compiled in {time.perf_counter() - started:.1f}s")
+    print(f"[OK] Published version {version} ({size / 1024 / 1024:.1f} MB) -> {version_dir}")
+
+
+if __name__ == '__main__':
+    main()
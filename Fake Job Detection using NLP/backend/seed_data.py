@@ -15,6 +15,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from app.database import init_db, SessionLocal
 from app.models import User, Prediction, FlaggedPost, ModelVersion
 from app.auth import hash_password
+from app.prediction_logger import log_prediction
 
 
 def seed():
@@ -74,15 +75,11 @@ def seed():
         
         for i, (text, pred, conf) in enumerate(sample_jobs):
             days_ago = random.randint(0, 29)
-            p = Prediction(
+            log_prediction(
+                db, text, pred, conf,
                 user_id=admin.id,
-                job_text=text,
-                prediction=pred,
-                confidence=conf,
-                created_at=datetime.utcnow() - timedelta(days=days_ago)
+                created_at=datetime.utcnow() - timedelta(days=days_ago),
             )
-            db.add(p)
-        db.commit()
         print(f"✓ {len(sample_jobs)} sample predictions seeded")
         
         # Flag some fake ones
@@ -0,0 +1,71 @@
+"""
+Shared fixtures. Run from the backend directory with `python -m pytest tests`.
+
+Endpoints are exercised with FastAPI's TestClient against a throwaway
+SQLite file, never the development jobcheck.db.
+"""
+import os
+import sys
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "test-secret")
+
+from app.database import Base, create_sqlite_engine, get_db  # noqa: E402
+from app import models  # noqa: E402,F401  (registers the tables on Base)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client(engine):
+    """TestClient whose requests use the test database (lifespan not run)."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+
+
+@pytest.fixture
+def count_queries(engine):
+    """Call with a function; returns how many SQL statements it executed."""
+    def run(fn):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            fn()
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        return len(statements)
+    return run
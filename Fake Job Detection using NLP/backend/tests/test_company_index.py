@@ -0,0 +1,45 @@
+"""
+CompanyIndex.match must give the same answer as a linear SequenceMatcher
+scan over every known company, including for non-ASCII names.
+"""
+import json
+import os
+from difflib import SequenceMatcher
+
+import pytest
+
+from app.company_index import MIN_SCORE, CompanyIndex, compile_index
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+def _linear_match(names, query):
+    """The scan the index replaces: exact match first, else the first best ratio."""
+    lowered = [n.lower() for n in names]
+    if query in lowered:
+        return lowered.index(query), 1.0
+    best_id, best_score = None, 0
+    for i, name in enumerate(lowered):
+        score = SequenceMatcher(None, query, name).ratio()
+        if score > best_score:
+            best_id, best_score = i, score
+    if best_score < MIN_SCORE:
+        return None, 0
+    return best_id, best_score
+
+
+@pytest.fixture(scope="module")
+def names():
+    with open(os.path.join(DATA_DIR, "known_companies.json"), "r", encoding="utf-8") as f:
+        companies = json.load(f)
+    return [c["name"] for c in companies] + ["日立製作所", "トヨタ自動車", "東芝", "ソニーグループ", "Société Générale"]
+
+
+@pytest.mark.parametrize("query", [
+    "東芝電", "ソニー", "日立製作", "トヨタ", "東京電力", "三菱",
+    "société générale", "societe generale", "nestlé",
+    "the sap", "gogle", "micro soft", "amazn web services", "xyz",
+])
+def test_match_agrees_with_linear_scan(names, query):
+    index = CompanyIndex(compile_index(names))
+    assert index.match(query) == pytest.approx(_linear_match(names, query))
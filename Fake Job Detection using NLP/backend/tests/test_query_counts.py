@@ -0,0 +1,43 @@
+"""
+Listing endpoints must run a fixed number of queries however many rows
+they return (no per-row lookups).
+"""
+import pytest
+
+from app.models import FlaggedPost, User, UserFeedback
+from app.prediction_logger import log_prediction
+
+
+def _seed(db, count):
+    """Add `count` flagged predictions with feedback, all by one user."""
+    user = db.query(User).filter(User.username == "tester").first()
+    if user is None:
+        user = User(username="tester", email="tester@example.com", password_hash="x")
+        db.add(user)
+        db.commit()
+    for i in range(count):
+        prediction = log_prediction(
+            db, f"Posting {i}: remote data entry, pay the training fee first",
+            "Fake" if i % 2 else "Real", 0.9, user_id=user.id,
+        )
+        db.add(FlaggedPost(prediction_id=prediction.id, reason=f"reason {i}", flagged_by="tester"))
+        db.add(UserFeedback(prediction_id=prediction.id, user_id=user.id,
+                            feedback="agree" if i % 3 else "disagree"))
+    db.commit()
+
+
+@pytest.mark.parametrize("path", ["/api/predictions", "/api/flagged", "/api/feedback/stats"])
+def test_query_count_does_not_grow_with_rows(client, db, count_queries, path):
+    _seed(db, 3)
+    few = count_queries(lambda: client.get(path).raise_for_status())
+    _seed(db, 20)
+    many = count_queries(lambda: client.get(path).raise_for_status())
+    assert 0 < many == few
+
+
+def test_predictions_listing_returns_every_row(client, db):
+    _seed(db, 12)
+    body = client.get("/api/predictions", params={"limit": 50}).json()
+    assert body["total"] == 12
+    assert len(body["predictions"]) == 12
+    assert all(p["is_flagged"] for p in body["predictions"])
@@ -0,0 +1,33 @@
+"""
+/api/stats must not cache a body that an invalidation made stale while it
+was being computed.
+"""
+from app import stats_cache
+from app.routes import stats
+
+
+def test_invalidation_during_compute_is_not_cached(client, monkeypatch):
+    stats_cache.invalidate()
+    compute = stats._compute_stats
+    calls = []
+
+    def compute_then_invalidate(db):
+        body = compute(db)
+        calls.append(body)
+        if len(calls) == 1:
+            stats_cache.invalidate()  # e.g. a prediction logged mid-compute
+        return body
+
+    monkeypatch.setattr(stats, "_compute_stats", compute_then_invalidate)
+
+    first = client.get("/api/stats")
+    assert first.status_code == 200
+    assert stats_cache.get() is None
+
+    second = client.get("/api/stats", headers={"If-None-Match": first.headers["ETag"]})
+    assert len(calls) == 2  # Recomputed rather than served from the cache
+    assert second.status_code == 304  # Same data, so the ETag still matches
+    assert stats_cache.get() is not None
+
+    client.get("/api/stats")
+    assert len(calls) == 2
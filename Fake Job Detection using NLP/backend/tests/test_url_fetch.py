@@ -0,0 +1,101 @@
+"""
+_fetch_page against a local HTTP server: a normal page, a page slower than
+the fetch deadline, and a 404.
+"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi import HTTPException
+
+from app.routes import url_scraper
+
+JOB_POSTING = {
+    "@context": "https://schema.org",
+    "@type": "JobPosting",
+    "title": "Backend Engineer",
+    "hiringOrganization": {"@type": "Organization", "name": "Acme Corp"},
+    "description": "<p>Build and run our Python services. Competitive salary and benefits.</p>",
+}
+JOB_PAGE = (
+    "<html><head><title>Backend Engineer</title>"
+    f'<script type="application/ld+json">{json.dumps(JOB_POSTING)}</script>'
+    "</head><body><p>Apply now</p></body></html>"
+).encode("utf-8")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/slow":
+            time.sleep(2)
+        if self.path in ("/job", "/slow"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(JOB_PAGE)))
+            self.end_headers()
+            self.wfile.write(JOB_PAGE)
+        else:
+            self.send_error(404)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def short_deadline(monkeypatch):
+    monkeypatch.setattr(url_scraper, "FETCH_DEADLINE", 0.5)
+
+
+def _fetch(url):
+    """Run one fetch on a fresh event loop, closing the shared client on it."""
+    async def run():
+        try:
+            return await url_scraper._fetch_page(url)
+        finally:
+            await url_scraper.close_client()
+    return asyncio.run(run())
+
+
+def test_fetch_page_reads_job_posting(server):
+    page = _fetch(server + "/job")
+    assert page.status_code == 200
+    assert page.bytes_read == len(JOB_PAGE)
+    assert not page.truncated
+
+    scraped = url_scraper._extract_job_text(page.text)
+    assert scraped["parser"] == "json-ld"
+    assert scraped["title"] == "Backend Engineer"
+    assert scraped["company"] == "Acme Corp"
+    assert "Python services" in scraped["text"]
+    assert url_scraper._host_slots == {}  # Idle hosts are not kept
+
+
+def test_fetch_page_enforces_deadline(server):
+    started = time.monotonic()
+    with pytest.raises(HTTPException) as exc:
+        _fetch(server + "/slow")
+    assert exc.value.status_code == 400
+    assert "timed out" in exc.value.detail
+    assert time.monotonic() - started < 1.5
+    assert url_scraper._host_slots == {}
+
+
+def test_fetch_page_reports_404(server):
+    with pytest.raises(HTTPException) as exc:
+        _fetch(server + "/missing")
+    assert exc.value.status_code == 400
+    assert "404" in exc.value.detail
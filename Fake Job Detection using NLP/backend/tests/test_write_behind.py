@@ -0,0 +1,39 @@
+"""
+With write-behind enabled a prediction may still be queued in another
+worker, so a missing prediction whose ID has been reserved is a 503 to
+retry, not a 404.
+"""
+import pytest
+
+from app import write_behind
+from app.models import IdSequence
+from app.prediction_logger import log_prediction
+
+
+@pytest.fixture
+def reserved(db, monkeypatch):
+    """One written prediction, with IDs up to 10 reserved by another worker."""
+    monkeypatch.setattr(write_behind, "ENABLED", True)
+    prediction = log_prediction(db, "Remote data entry, pay the training fee first", "Fake", 0.9)
+    db.merge(IdSequence(name="predictions", next_id=11))
+    db.commit()
+    return prediction.id
+
+
+def test_flag_reserved_id_asks_for_retry(client, reserved):
+    response = client.post("/api/flag", json={"prediction_id": 10, "reason": "scam"})
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+
+
+def test_flag_unreserved_id_is_not_found(client, reserved):
+    assert client.post("/api/flag", json={"prediction_id": 11}).status_code == 404
+
+
+def test_flag_written_prediction(client, reserved):
+    assert client.post("/api/flag", json={"prediction_id": reserved}).status_code == 200
+
+
+def test_missing_prediction_is_not_found_when_disabled(client, reserved, monkeypatch):
+    monkeypatch.setattr(write_behind, "ENABLED", False)
+    assert client.post("/api/flag", json={"prediction_id": 10}).status_code == 404